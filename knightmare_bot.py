@@ -10,6 +10,7 @@ import sys
 import random
 import time
 import traceback
+from operator import itemgetter
 
 # Piece values
 PIECE_VALUES = {
@@ -21,6 +22,11 @@ PIECE_VALUES = {
     chess.KING: 20000
 }
 
+# Transposition table entry flags
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+
 class KnightmareBot:
     def __init__(self):
         self.nodes = 0
@@ -38,31 +44,30 @@ class KnightmareBot:
         
         score = 0
         
-        # Material count
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                value = PIECE_VALUES[piece.piece_type]
-                
-                # Simple positional bonus
-                if piece.piece_type == chess.PAWN:
-                    rank = chess.square_rank(square)
-                    if piece.color == chess.WHITE:
-                        value += rank * 5
-                    else:
-                        value += (7 - rank) * 5
-                
-                # Center bonus for knights and bishops
-                if piece.piece_type in [chess.KNIGHT, chess.BISHOP]:
-                    file = chess.square_file(square)
-                    rank = chess.square_rank(square)
-                    center_dist = abs(3.5 - file) + abs(3.5 - rank)
-                    value += int((7 - center_dist) * 2)
-                
+        # Material count over occupied squares only (one piece_map() call
+        # instead of a piece_at() probe for all 64 squares)
+        for square, piece in board.piece_map().items():
+            value = PIECE_VALUES[piece.piece_type]
+            
+            # Simple positional bonus
+            if piece.piece_type == chess.PAWN:
+                rank = chess.square_rank(square)
                 if piece.color == chess.WHITE:
-                    score += value
+                    value += rank * 5
                 else:
-                    score -= value
+                    value += (7 - rank) * 5
+            
+            # Center bonus for knights and bishops
+            if piece.piece_type in [chess.KNIGHT, chess.BISHOP]:
+                file = chess.square_file(square)
+                rank = chess.square_rank(square)
+                center_dist = abs(3.5 - file) + abs(3.5 - rank)
+                value += int((7 - center_dist) * 2)
+            
+            if piece.color == chess.WHITE:
+                score += value
+            else:
+                score -= value
         
         # Mobility bonus
         mobility = len(list(board.legal_moves)) * 3
@@ -109,16 +114,56 @@ class KnightmareBot:
             
             scored.append((score, move))
         
-        scored.sort(key=lambda x: x[0], reverse=True)
+        scored.sort(key=itemgetter(0), reverse=True)
         return [m for _, m in scored]
     
-    def minimax(self, board, depth, alpha, beta, maximizing, ply=0):
+    def probe_tt(self, tt, key, depth, alpha, beta):
+        """Look up a position, returning (cutoff, value, move, alpha, beta)"""
+        entry = tt.get(key)
+        if not entry:
+            return False, None, None, alpha, beta
+        
+        tt_depth, flag, value, move = entry
+        if tt_depth >= depth:
+            if flag == TT_EXACT:
+                return True, value, move, alpha, beta
+            if flag == TT_LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if beta <= alpha:
+                return True, value, move, alpha, beta
+        
+        return False, value, move, alpha, beta
+    
+    def store_tt(self, tt, key, depth, value, move, alpha, beta):
+        """Store a search result with its bound relative to the original window"""
+        if value <= alpha:
+            flag = TT_UPPER
+        elif value >= beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        tt[key] = (depth, flag, value, move)
+    
+    def minimax(self, board, depth, alpha, beta, maximizing, ply=0, tt=None, hashmove=None):
         """Simplified but robust minimax"""
         self.nodes += 1
         
         if depth == 0 or board.is_game_over():
             return self.evaluate(board), None
         
+        # Transposition table lookup
+        key = None
+        alpha_orig, beta_orig = alpha, beta
+        if tt is not None:
+            key = board._transposition_key()
+            cutoff, value, tt_move, alpha, beta = self.probe_tt(tt, key, depth, alpha, beta)
+            if cutoff:
+                return value, tt_move
+            if hashmove is None:
+                hashmove = tt_move
+        
         moves = list(board.legal_moves)
         if not moves:
             return self.evaluate(board), None
@@ -126,6 +171,11 @@ class KnightmareBot:
         # Order moves
         moves = self.order_moves(board, moves, ply)
         
+        # Search the hash move (previous best) first
+        if hashmove in moves:
+            moves.remove(hashmove)
+            moves.insert(0, hashmove)
+        
         # Limit moves at low depth to prevent timeout
         if depth == 1:
             moves = moves[:15]
@@ -138,7 +188,7 @@ class KnightmareBot:
             max_eval = -float('inf')
             for move in moves:
                 board.push(move)
-                eval_score, _ = self.minimax(board, depth - 1, alpha, beta, False, ply + 1)
+                eval_score, _ = self.minimax(board, depth - 1, alpha, beta, False, ply + 1, tt)
                 board.pop()
                 
                 if eval_score > max_eval:
@@ -157,18 +207,20 @@ class KnightmareBot:
                                 self.killer_moves[ply].pop()
                         
                         # Update history
-                        key = (move.from_square, move.to_square)
-                        if key not in self.history_table:
-                            self.history_table[key] = 0
-                        self.history_table[key] += depth
+                        hist_key = (move.from_square, move.to_square)
+                        if hist_key not in self.history_table:
+                            self.history_table[hist_key] = 0
+                        self.history_table[hist_key] += depth
                     break
             
+            if tt is not None:
+                self.store_tt(tt, key, depth, max_eval, best_move, alpha_orig, beta_orig)
             return max_eval, best_move
         else:
             min_eval = float('inf')
             for move in moves:
                 board.push(move)
-                eval_score, _ = self.minimax(board, depth - 1, alpha, beta, True, ply + 1)
+                eval_score, _ = self.minimax(board, depth - 1, alpha, beta, True, ply + 1, tt)
                 board.pop()
                 
                 if eval_score < min_eval:
@@ -187,12 +239,14 @@ class KnightmareBot:
                                 self.killer_moves[ply].pop()
                         
                         # Update history
-                        key = (move.from_square, move.to_square)
-                        if key not in self.history_table:
-                            self.history_table[key] = 0
-                        self.history_table[key] += depth
+                        hist_key = (move.from_square, move.to_square)
+                        if hist_key not in self.history_table:
+                            self.history_table[hist_key] = 0
+                        self.history_table[hist_key] += depth
                     break
             
+            if tt is not None:
+                self.store_tt(tt, key, depth, min_eval, best_move, alpha_orig, beta_orig)
             return min_eval, best_move
     
     def get_move(self, board, time_limit=1.0):
@@ -224,7 +278,9 @@ class KnightmareBot:
             self.history_table.clear()
         self.killer_moves.clear()  # Clear each search
         
-        # Iterative deepening with time control
+        # Iterative deepening with time control; each iteration searches the
+        # previous best move first and shares one transposition table
+        tt = {}
         try:
             for depth in range(1, 5):
                 self.nodes = 0
@@ -236,7 +292,8 @@ class KnightmareBot:
                 
                 # Search with timeout protection
                 maximizing = board.turn == chess.WHITE
-                score, move = self.minimax(board, depth, -float('inf'), float('inf'), maximizing)
+                score, move = self.minimax(board, depth, -float('inf'), float('inf'), maximizing,
+                                           tt=tt, hashmove=best_move)
                 
                 if move and move in legal_moves:
                     best_move = move
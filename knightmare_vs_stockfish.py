@@ -4,7 +4,7 @@ Knightmare vs Stockfish Web Interface
 Test your bot against the world's strongest chess engine
 """
 
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, request
 import chess
 import chess.svg
 import chess.engine
@@ -12,8 +12,26 @@ import random
 import time
 import sys
 import os
+import threading
+import gzip
+from dataclasses import dataclass, field
+from queue import Queue, Empty
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 import subprocess
 
+# Prefer orjson for serializing responses
+try:
+    import orjson
+    
+    def dumps_json(payload):
+        return orjson.dumps(payload)
+except ImportError:
+    import json
+    
+    def dumps_json(payload):
+        return json.dumps(payload, separators=(',', ':'))
+
 # Add the current directory to path to import knightmare_bot
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -38,17 +56,35 @@ except Exception as e:
 
 app = Flask(__name__)
 
-# Global game state
-game_board = chess.Board()
-move_history = []
-knightmare = None
-stockfish_engine = None
-stockfish_level = 1  # 1-20 (1 is easiest)
-stockfish_time = 0.1  # Time in seconds for Stockfish to think
+@dataclass
+class GameState:
+    """Everything about the game in progress and the engines playing it"""
+    board: chess.Board = field(default_factory=chess.Board)
+    history: list = field(default_factory=list)
+    bot: object = None
+    engine: object = None  # Stockfish, once find_stockfish() starts it
+    level: int = 1  # 1-20 (1 is easiest)
+    think_time: float = 0.1  # Time in seconds for Stockfish to think
+    white_is_knightmare: bool = False
+    revision: int = 0  # bumped on every change to the game, tags /board responses
+    outcome: object = None  # as of the last change to the board, see update_outcome()
+
+# Game state lives on the app so handlers reach it through one lookup
+app.config['STATE'] = GameState()
+_SERVER_ID = os.urandom(4).hex()  # keeps ETags from an earlier server run from matching
+
+# Stockfish keeps its hash table between moves, so give it room to reuse
+STOCKFISH_HASH_MB = 256
+
+# Stockfish starts its reply in a background thread as soon as Knightmare
+# has moved, so it is usually ready when the next /move arrives
+_stockfish_pool = ThreadPoolExecutor(max_workers=1)
+_stockfish_pending = None  # (fen, level, think_time, Future)
+MOVE_TIMEOUT = 10  # seconds past think_time /move waits before playing a random move
 
 def find_stockfish():
     """Try to find and initialize Stockfish"""
-    global stockfish_engine
+    state = app.config['STATE']
     
     # Common Stockfish locations
     stockfish_paths = [
@@ -65,7 +101,8 @@ def find_stockfish():
             # Test if stockfish exists at this path
             result = subprocess.run([path, "help"], capture_output=True, timeout=1)
             if result.returncode == 0 or "Stockfish" in str(result.stdout):
-                stockfish_engine = chess.engine.SimpleEngine.popen_uci(path)
+                state.engine = chess.engine.SimpleEngine.popen_uci(path)
+                configure_stockfish(state.engine)
                 print(f"✅ Stockfish found at: {path}")
                 return True
         except:
@@ -77,36 +114,63 @@ def find_stockfish():
     print("   Windows: Download from https://stockfishchess.org/download/")
     return False
 
+def configure_stockfish(engine):
+    """Size Stockfish's hash table and threads (where it has the options)"""
+    options = {}
+    if "Hash" in engine.options:
+        options["Hash"] = min(STOCKFISH_HASH_MB, engine.options["Hash"].max)
+    if "Threads" in engine.options:
+        options["Threads"] = max(1, (os.cpu_count() or 2) // 2)
+    engine.configure(options)
+
 def reset_game():
-    global game_board, move_history, knightmare
-    game_board = chess.Board()
-    move_history = []
+    state = app.config['STATE']
+    cancel_stockfish_move()
+    # Reset in place instead of allocating a new board/list each game
+    state.board.reset()
+    state.history.clear()
+    update_outcome()
+    state.revision += 1
     if bot_class:
-        knightmare = bot_class()
+        state.bot = bot_class()
+
+def json_response(payload):
+    """Build a JSON response without going through jsonify"""
+    return Response(dumps_json(payload), mimetype='application/json')
+
+def get_random_move(board):
+    """Get random move"""
+    # Reservoir sampling picks uniformly without building a list of moves
+    chosen = None
+    for n, move in enumerate(board.generate_legal_moves(), 1):
+        if random.randrange(n) == 0:
+            chosen = move
+    return chosen
 
 def get_knightmare_move(board):
     """Get move from Knightmare bot"""
-    global knightmare
+    state = app.config['STATE']
     
     if not bot_class:
         # Fallback to random if bot not available
-        moves = list(board.legal_moves)
-        return random.choice(moves) if moves else None
+        return get_random_move(board)
     
     try:
-        if not knightmare:
-            knightmare = bot_class()
+        if not state.bot:
+            state.bot = bot_class()
+        knightmare = state.bot
         
-        # Try different method names that might exist
+        # Try different method names that might exist (Knightmare only pops
+        # moves it pushed itself, so the copies leave out the move stack)
         if hasattr(knightmare, 'get_best_move'):
-            return knightmare.get_best_move(board.copy(), max_time=2.0)
+            return knightmare.get_best_move(board.copy(stack=False), max_time=2.0)
         elif hasattr(knightmare, 'get_move'):
-            return knightmare.get_move(board.copy(), 2.0)
+            return knightmare.get_move(board.copy(stack=False), 2.0)
         else:
             # Try minimax directly
             if hasattr(knightmare, 'minimax'):
                 _, move = knightmare.minimax(
-                    board.copy(), 
+                    board.copy(stack=False), 
                     4,  # depth
                     -float('inf'), 
                     float('inf'), 
@@ -117,17 +181,15 @@ def get_knightmare_move(board):
         print(f"Error getting Knightmare move: {e}")
     
     # Fallback to random
-    moves = list(board.legal_moves)
-    return random.choice(moves) if moves else None
+    return get_random_move(board)
 
 def get_stockfish_move(board, level=1, think_time=0.1):
     """Get move from Stockfish"""
-    global stockfish_engine
+    stockfish_engine = app.config['STATE'].engine
     
     if not stockfish_engine:
         # Fallback to random if Stockfish not available
-        moves = list(board.legal_moves)
-        return random.choice(moves) if moves else None
+        return get_random_move(board)
     
     try:
         # Configure Stockfish strength (1-20)
@@ -138,8 +200,41 @@ def get_stockfish_move(board, level=1, think_time=0.1):
         return result.move
     except Exception as e:
         print(f"Error getting Stockfish move: {e}")
-        moves = list(board.legal_moves)
-        return random.choice(moves) if moves else None
+        return get_random_move(board)
+
+def submit_stockfish_move(board):
+    """Start Stockfish's reply in the background with the current settings"""
+    global _stockfish_pending
+    state = app.config['STATE']
+    if not state.engine:
+        return
+    future = _stockfish_pool.submit(get_stockfish_move, board.copy(),
+                                    state.level, state.think_time)
+    _stockfish_pending = (board.fen(), state.level, state.think_time, future)
+
+def cancel_stockfish_move():
+    """Drop any precomputed Stockfish move"""
+    global _stockfish_pending
+    if _stockfish_pending:
+        _stockfish_pending[3].cancel()
+    _stockfish_pending = None
+
+def take_stockfish_move(board, level, think_time):
+    """Get Stockfish's precomputed move, or search now if there is none
+    for this position and these settings"""
+    global _stockfish_pending
+    pending, _stockfish_pending = _stockfish_pending, None
+    
+    if pending and pending[:3] == (board.fen(), level, think_time):
+        try:
+            return pending[3].result(timeout=think_time + MOVE_TIMEOUT)
+        except TimeoutError:
+            print(f"Background Stockfish search took over {think_time + MOVE_TIMEOUT}s, playing a random move")
+            return get_random_move(board)
+        except Exception as e:
+            print(f"Error in background Stockfish search: {e}")
+    
+    return get_stockfish_move(board, level, think_time)
 
 HTML = """
 <!DOCTYPE html>
@@ -321,7 +416,7 @@ HTML = """
     
     <div class="container">
         <div class="board-container">
-            <div id="board">Loading...</div>
+            <div id="board"><img id="board-img" width="500" height="500" alt="Chess board"></div>
         </div>
         
         <div class="controls">
@@ -383,63 +478,97 @@ HTML = """
         let stockfishTime = 0.1;
         let whiteIsKnightmare = false;
         
-        function updateBoard() {
-            fetch('/board')
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('board').innerHTML = data.svg;
-                    
-                    // Update status with styling
-                    const statusEl = document.getElementById('status');
-                    statusEl.textContent = data.status;
-                    statusEl.className = '';
-                    
-                    if (data.status.includes('Checkmate')) {
-                        statusEl.className = 'checkmate';
-                    } else if (data.status.includes('CHECK')) {
-                        statusEl.className = 'check';
-                    }
-                    
-                    // Update move history
-                    let movesHtml = '';
-                    for (let i = 0; i < data.moves.length; i += 2) {
-                        let moveNum = Math.floor(i/2) + 1;
-                        let white = data.moves[i] || '';
-                        let black = data.moves[i+1] || '';
-                        movesHtml += '<div class="move-pair">' + moveNum + '. ' + white + ' ' + black + '</div>';
-                    }
-                    document.getElementById('moves').innerHTML = movesHtml;
-                    document.getElementById('moves').scrollTop = document.getElementById('moves').scrollHeight;
-                    
-                    // Update player indicators
-                    if (data.white_to_move) {
-                        document.getElementById('white-player-card').className = 'player-card active';
-                        document.getElementById('black-player-card').className = 'player-card inactive';
-                    } else {
-                        document.getElementById('white-player-card').className = 'player-card inactive';
-                        document.getElementById('black-player-card').className = 'player-card active';
-                    }
-                    
-                    // Update Stockfish status
-                    if (data.stockfish_available) {
-                        document.getElementById('stockfish-status').className = 'stockfish-status connected';
-                        document.getElementById('stockfish-status').textContent = '✅ Stockfish Connected';
-                    } else {
-                        document.getElementById('stockfish-status').className = 'stockfish-status disconnected';
-                        document.getElementById('stockfish-status').textContent = '❌ Stockfish Not Found (using random moves)';
-                    }
-                    
-                    // Stop auto play if game over
-                    if (data.game_over && autoPlay) {
-                        stopAuto();
-                        // Show result alert
-                        setTimeout(() => {
-                            if (confirm(data.status + '\\n\\nPlay another game?')) {
-                                newGame();
-                            }
-                        }, 500);
+        // The server pushes the board state whenever it changes
+        // Moves already in the history list; the server only sends the
+        // moves from index moves_since on
+        let shownMoves = [];
+        
+        function showMoves(since, newMoves) {
+            const movesEl = document.getElementById('moves');
+            if (since > shownMoves.length) {
+                // Missed some moves, so ask for everything after ours
+                fetch('/board?since=' + shownMoves.length)
+                    .then(response => response.json())
+                    .then(data => showMoves(data.moves_since, data.new_moves));
+                return;
+            }
+            if (since < shownMoves.length) {
+                // Replace the moves from since on (a new game starts over from 0)
+                shownMoves.length = since;
+                while (movesEl.children.length > Math.ceil(since / 2)) {
+                    movesEl.lastElementChild.remove();
+                }
+                if (since % 2) {
+                    movesEl.lastElementChild.textContent = (since + 1) / 2 + '. ' + shownMoves[since - 1];
+                }
+            }
+            for (const move of newMoves) {
+                if (shownMoves.length % 2 === 0) {
+                    const pair = document.createElement('div');
+                    pair.className = 'move-pair';
+                    pair.textContent = (shownMoves.length / 2 + 1) + '. ' + move;
+                    movesEl.appendChild(pair);
+                } else {
+                    movesEl.lastElementChild.textContent += ' ' + move;
+                }
+                shownMoves.push(move);
+            }
+            if (newMoves.length) {
+                movesEl.scrollTop = movesEl.scrollHeight;
+            }
+        }
+        
+        function renderBoard(data) {
+            // The picture only changes with the pieces, and each placement
+            // has its own URL the browser can cache
+            const boardSrc = '/board.svg?fen=' + encodeURIComponent(data.fen);
+            const boardImg = document.getElementById('board-img');
+            if (boardImg.getAttribute('src') !== boardSrc) {
+                boardImg.src = boardSrc;
+            }
+            
+            // Update status with styling
+            const statusEl = document.getElementById('status');
+            statusEl.textContent = data.status;
+            statusEl.className = '';
+            
+            if (data.status.includes('Checkmate')) {
+                statusEl.className = 'checkmate';
+            } else if (data.status.includes('CHECK')) {
+                statusEl.className = 'check';
+            }
+            
+            // Update move history
+            showMoves(data.moves_since, data.new_moves);
+            
+            // Update player indicators
+            if (data.white_to_move) {
+                document.getElementById('white-player-card').className = 'player-card active';
+                document.getElementById('black-player-card').className = 'player-card inactive';
+            } else {
+                document.getElementById('white-player-card').className = 'player-card inactive';
+                document.getElementById('black-player-card').className = 'player-card active';
+            }
+            
+            // Update Stockfish status
+            if (data.stockfish_available) {
+                document.getElementById('stockfish-status').className = 'stockfish-status connected';
+                document.getElementById('stockfish-status').textContent = '✅ Stockfish Connected';
+            } else {
+                document.getElementById('stockfish-status').className = 'stockfish-status disconnected';
+                document.getElementById('stockfish-status').textContent = '❌ Stockfish Not Found (using random moves)';
+            }
+            
+            // Stop auto play if game over
+            if (data.game_over && autoPlay) {
+                stopAuto();
+                // Show result alert
+                setTimeout(() => {
+                    if (confirm(data.status + '\\n\\nPlay another game?')) {
+                        newGame();
                     }
-                });
+                }, 500);
+            }
         }
         
         function updateLevel() {
@@ -487,126 +616,288 @@ HTML = """
         
         function newGame() {
             stopAuto();
-            fetch('/new_game', {method: 'POST'})
-                .then(() => updateBoard());
+            fetch('/new_game', {method: 'POST'});
         }
         
         function makeMove() {
-            fetch('/move', {method: 'POST'})
+            return fetch('/move', {method: 'POST'})
                 .then(response => response.json())
                 .then(data => {
                     if (data.error) {
                         console.error(data.error);
                     }
-                    updateBoard();
                 });
         }
         
+        // Auto play waits for each move before scheduling the next one
+        function autoMove() {
+            makeMove().then(() => {
+                if (autoPlay) {
+                    autoPlay = setTimeout(autoMove, 1500);
+                }
+            });
+        }
+        
         function toggleAuto() {
             if (autoPlay) {
                 stopAuto();
             } else {
                 document.getElementById('auto-btn').textContent = '⏸️ Auto Play: ON';
                 document.getElementById('auto-btn').className = 'active';
-                autoPlay = setInterval(makeMove, 1500);
-                makeMove();  // Make first move immediately
+                autoPlay = setTimeout(autoMove, 0);  // Make first move immediately
             }
         }
         
         function stopAuto() {
             if (autoPlay) {
-                clearInterval(autoPlay);
+                clearTimeout(autoPlay);
                 autoPlay = null;
                 document.getElementById('auto-btn').textContent = '🔄 Auto Play: OFF';
                 document.getElementById('auto-btn').className = '';
             }
         }
         
-        // Load board on startup
-        updateBoard();
+        // Load the board on startup and follow every change after that
+        const boardEvents = new EventSource('/stream');
+        boardEvents.onmessage = event => renderBoard(JSON.parse(event.data));
     </script>
 </body>
 </html>
 """
 
+# Status text for drawn/ended games by how they ended
+_OUTCOME_STATUS = {
+    chess.Termination.STALEMATE: "Stalemate - Draw!",
+    chess.Termination.INSUFFICIENT_MATERIAL: "Draw - Insufficient material",
+    chess.Termination.FIFTY_MOVES: "Draw - 50 move rule",
+    chess.Termination.THREEFOLD_REPETITION: "Draw - Threefold repetition",
+}
+
+# Status text for each player, indexed by [white_is_knightmare][color]
+# (chess.BLACK is 0), and for a game in progress by [turn][in check] after that
+_PLAYER_NAMES = (
+    ("Black (Knightmare)", "White (Stockfish)"),
+    ("Black (Stockfish)", "White (Knightmare)"),
+)
+_TURN_STATUS = tuple(
+    tuple((f"{name} to move", f"{name} to move - CHECK!") for name in names)
+    for names in _PLAYER_NAMES
+)
+_CHECKMATE_STATUS = tuple(
+    tuple(f"Checkmate! {name} wins!" for name in names)
+    for names in _PLAYER_NAMES
+)
+
+def tag_response(response, etag):
+    """Tag a /board response so the browser revalidates it with If-None-Match"""
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+def update_outcome():
+    """Work out the game's outcome (claimable draws included) after a change
+    to the board. outcome(claim_draw=True) pushes and pops moves on the
+    board, so only code that changes the board calls this (holding
+    _move_lock, or in reset_game), before it bumps the revision."""
+    state = app.config['STATE']
+    state.outcome = state.board.outcome(claim_draw=True)
+
+def game_outcome():
+    """The game's outcome as worked out by update_outcome(), shared by
+    /move, /board and /stream without touching the board"""
+    return app.config['STATE'].outcome
+
+# Rendered board SVGs keyed by piece placement (the SVG depends on nothing
+# else), so polling an unchanged position doesn't re-render it
+@lru_cache(maxsize=256)
+def render_board_svg(board_fen):
+    """Render the board SVG for a piece placement"""
+    return chess.svg.board(chess.BaseBoard(board_fen), size=500)
+
+@lru_cache(maxsize=256)
+def compress_board_svg(board_fen):
+    """Gzip the board SVG for a piece placement (SVG shrinks several times over)"""
+    return gzip.compress(render_board_svg(board_fen).encode())
+
+# Every game starts from the same placement, so its SVG is rendered at import
+# and kept outside the caches above, where a long game could evict it
+_STARTPOS_SVG = render_board_svg.__wrapped__(chess.STARTING_BOARD_FEN)
+_STARTPOS_SVG_GZIP = gzip.compress(_STARTPOS_SVG.encode())
+
+@app.route('/board.svg')
+def get_board_svg():
+    """The board picture for the placement in ?fen=, which never changes,
+    so the browser keeps it instead of fetching it again"""
+    board_fen = request.args.get('fen', chess.STARTING_BOARD_FEN)
+    gzipped = 'gzip' in request.accept_encodings
+    if board_fen == chess.STARTING_BOARD_FEN:
+        svg = _STARTPOS_SVG_GZIP if gzipped else _STARTPOS_SVG
+    else:
+        try:
+            svg = compress_board_svg(board_fen) if gzipped else render_board_svg(board_fen)
+        except ValueError:
+            return Response('Invalid board FEN', status=400)
+    
+    response = Response(svg, mimetype='image/svg+xml')
+    if gzipped:
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/')
 def index():
-    return render_template_string(HTML)
+    # The page has no template variables, so skip Jinja and send it as is
+    return Response(HTML, mimetype='text/html')
 
-@app.route('/board')
-def get_board():
-    global game_board, move_history, stockfish_engine
+def board_state(since=0):
+    """Collect what the page shows for the current game, with the moves
+    from index since on (the client already has the earlier ones)"""
+    state = app.config['STATE']
+    game_board = state.board
+    since = min(max(since, 0), len(state.history))
     
-    svg = chess.svg.board(game_board, size=500)
-    
-    # Determine game status
-    if game_board.is_checkmate():
-        winner = "White" if game_board.turn == chess.BLACK else "Black"
-        if app.config.get('white_is_knightmare', False):
-            winner += " (Knightmare)" if winner == "White" else " (Stockfish)"
-        else:
-            winner += " (Stockfish)" if winner == "White" else " (Knightmare)"
-        status = f"Checkmate! {winner} wins!"
-    elif game_board.is_stalemate():
-        status = "Stalemate - Draw!"
-    elif game_board.is_insufficient_material():
-        status = "Draw - Insufficient material"
-    elif game_board.is_fifty_moves():
-        status = "Draw - 50 move rule"
-    elif game_board.is_game_over():
-        status = "Game Over"
+    # Determine game status (one outcome() call covers every way a game ends)
+    outcome = game_outcome()
+    if outcome is None:
+        status = _TURN_STATUS[state.white_is_knightmare][game_board.turn][game_board.is_check()]
+    elif outcome.termination == chess.Termination.CHECKMATE:
+        status = _CHECKMATE_STATUS[state.white_is_knightmare][outcome.winner]
     else:
-        if app.config.get('white_is_knightmare', False):
-            turn = "White (Knightmare)" if game_board.turn == chess.WHITE else "Black (Stockfish)"
-        else:
-            turn = "White (Stockfish)" if game_board.turn == chess.WHITE else "Black (Knightmare)"
-        status = f"{turn} to move"
-        if game_board.is_check():
-            status += " - CHECK!"
+        status = _OUTCOME_STATUS.get(outcome.termination, "Game Over")
     
-    return jsonify({
-        'svg': svg,
+    return {
+        'fen': game_board.board_fen(),
         'status': status,
-        'moves': move_history,
-        'game_over': game_board.is_game_over(),
+        'moves_since': since,
+        'new_moves': state.history[since:],
+        'game_over': outcome is not None,
         'white_to_move': game_board.turn == chess.WHITE,
-        'stockfish_available': stockfish_engine is not None
-    })
+        'stockfish_available': state.engine is not None
+    }
+
+@app.route('/board')
+def get_board():
+    state = app.config['STATE']
+    
+    # Unchanged since the client's copy (the status also depends on the
+    # player colors and Stockfish), so skip building the response
+    etag = (f"{_SERVER_ID}-{state.revision}-{int(state.white_is_knightmare)}"
+            f"-{int(state.engine is not None)}")
+    if request.if_none_match.contains(etag):
+        return tag_response(Response(status=304), etag)
+    
+    since = request.args.get('since', 0, type=int)
+    return tag_response(json_response(board_state(since)), etag)
+
+# Queues of /stream clients waiting for the next board state
+_subscribers = []
+_subscribers_lock = threading.Lock()
+_moves_broadcast = 0  # length of the move history at the last broadcast
+
+def board_event(since=0):
+    """Format the current board state as a server-sent event"""
+    data = dumps_json(board_state(since))
+    if isinstance(data, bytes):  # orjson
+        data = data.decode()
+    return f"data: {data}\n\n"
+
+def broadcast_board():
+    """Push the current board state to every /stream client"""
+    global _moves_broadcast
+    if not _subscribers:
+        return
+    with _subscribers_lock:
+        # Only the moves made since the last broadcast
+        event = board_event(_moves_broadcast)
+        _moves_broadcast = len(app.config['STATE'].history)
+        for updates in _subscribers:
+            updates.put(event)
+
+@app.route('/stream')
+def stream():
+    """Server-sent events: the board state now and after every change"""
+    def events():
+        updates = Queue()
+        with _subscribers_lock:
+            _subscribers.append(updates)
+        try:
+            yield board_event()
+            while True:
+                try:
+                    yield updates.get(timeout=15)
+                except Empty:
+                    # Comment line; lets a closed connection be noticed
+                    yield ": keepalive\n\n"
+        finally:
+            with _subscribers_lock:
+                _subscribers.remove(updates)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+# The dev server answers each request on its own thread, so /board polls
+# are served while a bot thinks; this keeps /move calls from overlapping
+# each other or a new game
+_move_lock = threading.Lock()
 
 @app.route('/new_game', methods=['POST'])
 def new_game():
-    reset_game()
-    return jsonify({'success': True})
+    # Wait for a move in progress, so it isn't played on the new board
+    with _move_lock:
+        reset_game()
+    broadcast_board()
+    return json_response({'success': True})
 
 @app.route('/set_stockfish_level', methods=['POST'])
 def set_stockfish_level():
-    global stockfish_level
-    data = request.get_json()
-    stockfish_level = data.get('level', 1)
-    return jsonify({'success': True})
+    data = request.get_json(silent=True) or {}
+    app.config['STATE'].level = data.get('level', 1)
+    return json_response({'success': True})
 
 @app.route('/set_stockfish_time', methods=['POST'])
 def set_stockfish_time():
-    global stockfish_time
-    data = request.get_json()
-    stockfish_time = data.get('time', 0.1)
-    return jsonify({'success': True})
+    data = request.get_json(silent=True) or {}
+    app.config['STATE'].think_time = data.get('time', 0.1)
+    return json_response({'success': True})
 
 @app.route('/set_colors', methods=['POST'])
 def set_colors():
-    data = request.get_json()
-    app.config['white_is_knightmare'] = data.get('white_is_knightmare', False)
-    return jsonify({'success': True})
+    data = request.get_json(silent=True) or {}
+    app.config['STATE'].white_is_knightmare = bool(data.get('white_is_knightmare', False))
+    broadcast_board()
+    return json_response({'success': True})
 
 @app.route('/move', methods=['POST'])
 def make_move():
-    global game_board, move_history, stockfish_level, stockfish_time
+    # Auto-play can fire again before a slow move returns; don't start a
+    # second search for the same position
+    if not _move_lock.acquire(blocking=False):
+        return json_response({'error': 'Move already in progress'})
+    state = app.config['STATE']
+    try:
+        revision = state.revision
+        response = play_next_move()
+    finally:
+        _move_lock.release()
+    
+    if state.revision != revision:
+        broadcast_board()
+    return response
+
+def play_next_move():
+    """Play the move for the side to move and record it"""
+    state = app.config['STATE']
+    game_board = state.board
     
-    if game_board.is_game_over():
-        return jsonify({'error': 'Game is over'})
+    # Claimable draws end the game too, matching the status /board shows
+    if game_outcome() is not None:
+        return json_response({'error': 'Game is over'})
     
     try:
-        white_is_knightmare = app.config.get('white_is_knightmare', False)
+        white_is_knightmare = state.white_is_knightmare
         
         # Determine whose turn it is and which engine to use
         if game_board.turn == chess.WHITE:
@@ -616,40 +907,47 @@ def make_move():
                 player = "Knightmare"
             else:
                 # Stockfish plays White
-                move = get_stockfish_move(game_board, stockfish_level, stockfish_time)
-                player = f"Stockfish(L{stockfish_level})"
+                move = take_stockfish_move(game_board, state.level, state.think_time)
+                player = f"Stockfish(L{state.level})"
         else:
             if white_is_knightmare:
                 # Stockfish plays Black
-                move = get_stockfish_move(game_board, stockfish_level, stockfish_time)
-                player = f"Stockfish(L{stockfish_level})"
+                move = take_stockfish_move(game_board, state.level, state.think_time)
+                player = f"Stockfish(L{state.level})"
             else:
                 # Knightmare plays Black
                 move = get_knightmare_move(game_board)
                 player = "Knightmare"
         
-        if move and move in game_board.legal_moves:
-            san = game_board.san(move)
-            game_board.push(move)
-            move_history.append(f"{san}")  # Just the move notation
-            return jsonify({'success': True})
+        if move is not None and game_board.is_legal(move):
+            san = game_board.san_and_push(move)
+            state.history.append(f"{san}")  # Just the move notation
+            update_outcome()
+            state.revision += 1
+            
+            # Let Stockfish think about its reply while the client renders
+            if player == "Knightmare" and game_outcome() is None:
+                submit_stockfish_move(game_board)
+            return json_response({'success': True})
         else:
-            return jsonify({'error': f'{player} failed to make valid move'})
+            return json_response({'error': f'{player} failed to make valid move'})
             
     except Exception as e:
         print(f"Error in make_move: {e}")
+        cancel_stockfish_move()
         # Fallback to random move
-        moves = list(game_board.legal_moves)
-        if moves:
-            move = random.choice(moves)
-            san = game_board.san(move)
-            game_board.push(move)
-            move_history.append(f"{san}")
-            return jsonify({'success': True})
-        return jsonify({'error': str(e)})
+        move = get_random_move(game_board)
+        if move:
+            san = game_board.san_and_push(move)
+            state.history.append(f"{san}")
+            update_outcome()
+            state.revision += 1
+            return json_response({'success': True})
+        return json_response({'error': str(e)})
 
 @app.route('/shutdown', methods=['POST'])
 def shutdown():
+    stockfish_engine = app.config['STATE'].engine
     if stockfish_engine:
         stockfish_engine.quit()
     func = request.environ.get('werkzeug.server.shutdown')
@@ -675,8 +973,8 @@ if __name__ == '__main__':
     # Check for Stockfish
     if find_stockfish():
         print("✅ Stockfish engine initialized!")
-        print(f"   Default level: {stockfish_level} (adjustable 1-20)")
-        print(f"   Default time: {stockfish_time}s per move")
+        print(f"   Default level: {app.config['STATE'].level} (adjustable 1-20)")
+        print(f"   Default time: {app.config['STATE'].think_time}s per move")
     else:
         print("⚠️  Stockfish not available - opponent will use random moves")
         print("\nTo install Stockfish:")
@@ -684,9 +982,6 @@ if __name__ == '__main__':
         print("   Linux: sudo apt-get install stockfish")
         print("   Windows: Download from stockfishchess.org")
     
-    # Set default colors
-    app.config['white_is_knightmare'] = False
-    
     print("\n" + "="*60)
     print("Open your browser to: http://localhost:5002")
     print("="*60)
@@ -699,7 +994,8 @@ if __name__ == '__main__':
     print("="*60 + "\n")
     
     try:
-        app.run(debug=False, port=5002)
+        app.run(debug=False, port=5002, threaded=True)
     finally:
-        if stockfish_engine:
-            stockfish_engine.quit()
\ No newline at end of file
+        _stockfish_pool.shutdown(cancel_futures=True)
+        if app.config['STATE'].engine:
+            app.config['STATE'].engine.quit()
\ No newline at end of file
@@ -5,11 +5,39 @@ No dependency on chester library
 """
 
 import subprocess
+import select
 import chess
-import chess.pgn
 import time
 import io
-from datetime import datetime
+import os
+import sys
+from collections import defaultdict
+from heapq import nlargest
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import util
+
+# Bot scripts the tournament runs, resolved next to this file so games
+# don't depend on the working directory
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_FILES = ("knightmare_bot.py", "random_chess_bot.py")
+KNIGHTMARE_PATH = os.path.join(BOT_DIR, "knightmare_bot.py")
+RANDOM_PATH = os.path.join(BOT_DIR, "random_chess_bot.py")
+
+# Per-worker game settings and engines, bound once by _init_worker so each
+# task only carries its game number and the engines are reused across games
+_TIME_PER_MOVE = 1000
+_NUM_GAMES = 0
+_PLAYERS = ((KNIGHTMARE_PATH, "Knightmare"), (RANDOM_PATH, "Random"))
+_ENGINES = None  # (Knightmare, Random) ChessEngines of this worker
+
+# Points for (white, black) and the report line for each game result
+_RESULT_TABLE = {"white": (1.0, 0.0), "black": (0.0, 1.0), "draw": (0.5, 0.5)}
+_RESULT_LINES = {
+    "white": "Result: {white} wins!",
+    "black": "Result: {black} wins!",
+    "draw": "Result: Draw",
+}
 
 class ChessEngine:
     def __init__(self, path, name):
@@ -24,8 +52,7 @@ class ChessEngine:
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL,
-            text=True,
-            bufsize=0
+            bufsize=0  # unbuffered, so select() sees every line
         )
         
         # Send UCI initialization
@@ -35,19 +62,38 @@ class ChessEngine:
         self.send("isready")
         self.wait_for("readyok")
         
+    def new_game(self):
+        """Reset the engine for a new game, restarting it if it has exited"""
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        self.send("ucinewgame")
+        self.send("isready")
+        self.wait_for("readyok")
+        
     def send(self, command):
         """Send command to engine"""
-        self.process.stdin.write(command + '\n')
+        self.process.stdin.write((command + '\n').encode())
         self.process.stdin.flush()
         
+    def read_line(self, deadline, waiting_for):
+        """Read one line, raising TimeoutError if none arrives by deadline
+        and EOFError if the engine has exited"""
+        ready, _, _ = select.select([self.process.stdout], [], [],
+                                    max(0, deadline - time.monotonic()))
+        if not ready:
+            raise TimeoutError(f"Timeout waiting for {waiting_for} from {self.name}")
+        line = self.process.stdout.readline()
+        if not line:
+            raise EOFError(f"{self.name} exited")
+        return line.decode().strip()
+        
     def wait_for(self, response, timeout=5):
         """Wait for specific response"""
-        start = time.time()
-        while time.time() - start < timeout:
-            line = self.process.stdout.readline().strip()
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self.read_line(deadline, response)
             if response in line:
                 return line
-        raise TimeoutError(f"Timeout waiting for {response} from {self.name}")
     
     def get_move(self, board, time_ms=1000):
         """Get a move for the current position"""
@@ -61,42 +107,44 @@ class ChessEngine:
         # Request move
         self.send(f"go movetime {time_ms}")
         
-        # Wait for bestmove
-        start = time.time()
-        while time.time() - start < (time_ms/1000 + 2):
-            line = self.process.stdout.readline().strip()
+        # Wait for bestmove; a bot that overruns is killed so the next game
+        # restarts it instead of waiting on it
+        deadline = time.monotonic() + time_ms / 1000 + 2
+        while True:
+            try:
+                line = self.read_line(deadline, "bestmove")
+            except TimeoutError:
+                self.process.kill()
+                self.process.wait()
+                raise
             if line.startswith("bestmove"):
                 move_uci = line.split()[1]
                 if move_uci == "0000":
                     return None
                 try:
                     return chess.Move.from_uci(move_uci)
-                except:
+                except ValueError:
                     print(f"Invalid move from {self.name}: {move_uci}")
                     return None
-        
-        return None
     
     def quit(self):
         """Quit the engine"""
         if self.process:
-            self.send("quit")
+            try:
+                self.send("quit")
+            except BrokenPipeError:
+                pass  # Already exited
             time.sleep(0.2)
             self.process.terminate()
             try:
                 self.process.wait(timeout=2)
-            except:
+            except subprocess.TimeoutExpired:
                 self.process.kill()
 
-def play_game(white_engine, black_engine, max_moves=200, time_per_move=1000):
-    """Play a single game between two engines"""
+def play_game(white_engine, black_engine, max_moves=200, time_per_move=1000, prefix=""):
+    """Play a single game between two engines (progress lines start with prefix)"""
+    # Only the result is reported, so no PGN game tree is built
     board = chess.Board()
-    game = chess.pgn.Game()
-    game.headers["White"] = white_engine.name
-    game.headers["Black"] = black_engine.name
-    game.headers["Date"] = datetime.now().strftime("%Y.%m.%d")
-    
-    node = game
     move_count = 0
     
     while not board.is_game_over() and move_count < max_moves:
@@ -111,151 +159,198 @@ def play_game(white_engine, black_engine, max_moves=200, time_per_move=1000):
                 # Make the move
                 san = board.san(move)
                 board.push(move)
-                node = node.add_variation(move)
                 move_count += 1
                 
                 # Print progress
                 if move_count % 20 == 0:
-                    print(f"  Move {move_count}: {current_engine.name} played {san}")
+                    print(f"  {prefix}Move {move_count}: {current_engine.name} played {san}")
                     
             else:
-                print(f"  Invalid or no move from {current_engine.name}")
+                print(f"  {prefix}Invalid or no move from {current_engine.name}")
                 break
                 
-        except Exception as e:
-            print(f"  Error getting move from {current_engine.name}: {e}")
+        except (TimeoutError, EOFError, BrokenPipeError) as e:
+            print(f"  {prefix}Error getting move from {current_engine.name}: {e}")
             break
     
     # Determine result
     if board.is_checkmate():
         if board.turn == chess.WHITE:
-            game.headers["Result"] = "0-1"
             return "black"
         else:
-            game.headers["Result"] = "1-0"
             return "white"
     elif board.is_stalemate():
-        game.headers["Result"] = "1/2-1/2"
         return "draw"
     elif board.is_insufficient_material():
-        game.headers["Result"] = "1/2-1/2"
         return "draw"
     elif board.can_claim_fifty_moves():
-        game.headers["Result"] = "1/2-1/2"
         return "draw"
     elif move_count >= max_moves:
-        game.headers["Result"] = "1/2-1/2"
         return "draw"
     else:
         # Incomplete game
-        game.headers["Result"] = "*"
         return "incomplete"
 
-def run_tournament(num_games=10):
+def _init_worker(time_per_move, num_games, players):
+    """Bind the tournament settings in a worker process and create the two
+    engines it plays every game with"""
+    global _TIME_PER_MOVE, _NUM_GAMES, _PLAYERS, _ENGINES
+    _TIME_PER_MOVE, _NUM_GAMES, _PLAYERS = time_per_move, num_games, players
+    _ENGINES = (ChessEngine(*players[0]), ChessEngine(*players[1]))
+    # Pool workers leave through os._exit, which skips atexit handlers, so
+    # the engines are closed by a multiprocessing finalizer instead
+    util.Finalize(None, _close_engines, exitpriority=10)
+
+def _close_engines():
+    """Quit this worker's engines"""
+    for engine in _ENGINES:
+        engine.quit()
+
+def play_one_game(game_num):
+    """Play one tournament game in a worker process on the worker's engines"""
+    knightmare, random_bot = _ENGINES
+    
+    # Alternate colors
+    if game_num % 2 == 1:
+        white, black = knightmare, random_bot
+    else:
+        white, black = random_bot, knightmare
+    
+    game = {"game_num": game_num, "white": white.name, "black": black.name}
+    
+    # Announce the game before its progress lines
+    sys.stdout.write(f"\nGame {game_num}/{_NUM_GAMES}\n"
+                     f"White: {white.name} vs Black: {black.name}\n")
+    sys.stdout.flush()
+    
+    try:
+        # Send new game command (starts the engines the first time)
+        white.new_game()
+        black.new_game()
+        
+        # Play game
+        game["result"] = play_game(white, black, time_per_move=_TIME_PER_MOVE,
+                                   prefix=f"Game {game_num}: ")
+        
+    except (TimeoutError, EOFError, BrokenPipeError) as e:
+        # Engine failures forfeit this game only; a bot that can't
+        # be launched at all stops the tournament
+        game["result"] = "error"
+        game["error"] = str(e)
+    
+    # Report the result here too, so it follows the game's progress lines
+    if game["result"] == "error":
+        line = f"Error in game {game_num}: {game['error']}"
+    else:
+        line = (f"Game {game_num}/{_NUM_GAMES} "
+                + _RESULT_LINES.get(game["result"], "Result: Incomplete game")
+                .format(white=white.name, black=black.name))
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+    return game
+
+def find_missing_bots():
+    """Return the bot scripts that are missing from BOT_DIR"""
+    # One directory read instead of a stat per bot
+    with os.scandir(BOT_DIR) as entries:
+        present = {entry.name for entry in entries if entry.is_file()}
+    return [name for name in BOT_FILES if name not in present]
+
+def run_tournament(num_games=10, time_per_move=1000):
     """Run a tournament between Knightmare and Random bots"""
+    missing = find_missing_bots()
+    if missing:
+        print(f"Error: bot scripts not found: {', '.join(missing)}")
+        return
+    
+    # Each game runs two bot processes, so use half the cores
+    workers = max(1, min(num_games, (os.cpu_count() or 2) // 2))
+    
     print("=" * 60)
     print("Simple Chess Tournament")
     print("=" * 60)
     print(f"Games to play: {num_games}")
-    print("Time per move: 1000ms")
+    print(f"Time per move: {time_per_move}ms")
+    print(f"Parallel games: {workers}")
     print("=" * 60)
     
-    results = {"knightmare": 0, "random": 0, "draw": 0}
+    # Points per bot name; draws are counted separately
+    scores = defaultdict(float, Knightmare=0.0, Random=0.0)
+    draws = 0
     
-    for game_num in range(1, num_games + 1):
-        print(f"\nGame {game_num}/{num_games}")
-        
-        # Alternate colors
-        if game_num % 2 == 1:
-            white = ChessEngine("./knightmare_bot.py", "Knightmare")
-            black = ChessEngine("./random_chess_bot.py", "Random")
-            white_name = "Knightmare"
-            black_name = "Random"
-        else:
-            white = ChessEngine("./random_chess_bot.py", "Random")
-            black = ChessEngine("./knightmare_bot.py", "Knightmare")
-            white_name = "Random"
-            black_name = "Knightmare"
+    # Games are independent, so play them in parallel (each worker reports
+    # its own games) and tally them as they finish
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(time_per_move, num_games, _PLAYERS))
+    try:
+        # One task per game, so a worker that finishes a short game picks up
+        # the next one and each result is reported as soon as it is known
+        futures = [pool.submit(play_one_game, game_num)
+                   for game_num in range(1, num_games + 1)]
         
-        print(f"White: {white_name} vs Black: {black_name}")
-        
-        try:
-            # Start engines
-            white.start()
-            black.start()
-            
-            # Send new game command
-            white.send("ucinewgame")
-            black.send("ucinewgame")
-            time.sleep(0.1)
-            
-            # Play game
-            result = play_game(white, black)
+        for future in as_completed(futures):
+            game = future.result()
+            white_name = game["white"]
+            black_name = game["black"]
+            result = game["result"]
             
             # Update results
-            if result == "white":
-                print(f"Result: {white_name} wins!")
-                if white_name == "Knightmare":
-                    results["knightmare"] += 1
-                else:
-                    results["random"] += 1
-            elif result == "black":
-                print(f"Result: {black_name} wins!")
-                if black_name == "Knightmare":
-                    results["knightmare"] += 1
-                else:
-                    results["random"] += 1
-            elif result == "draw":
-                print("Result: Draw")
-                results["draw"] += 0.5
-                results["knightmare"] += 0.5
-                results["random"] += 0.5
-            else:
-                print("Result: Incomplete game")
-            
-        except Exception as e:
-            print(f"Error in game {game_num}: {e}")
-        
-        finally:
-            # Cleanup
-            white.quit()
-            black.quit()
+            white_points, black_points = _RESULT_TABLE.get(result, (0.0, 0.0))
+            scores[white_name] += white_points
+            scores[black_name] += black_points
+            if result == "draw":
+                draws += 1
+    
+    except FileNotFoundError as e:
+        print(f"\nError: could not start a bot: {e}")
+        pool.shutdown(wait=False, cancel_futures=True)
+        sys.exit(1)
+    
+    except KeyboardInterrupt:
+        print("\nTournament interrupted, cancelling remaining games")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    
+    finally:
+        pool.shutdown()
     
     # Print final results
     print("\n" + "=" * 60)
     print("FINAL RESULTS")
     print("=" * 60)
     
-    knightmare_percentage = (results["knightmare"] / num_games) * 100
-    random_percentage = (results["random"] / num_games) * 100
+    # Rank once and use it for both the table and the winner
+    ranking = nlargest(len(scores), scores.items(), key=itemgetter(1))
+    pct_per_game = 100.0 / num_games
     
-    print(f"Knightmare: {results['knightmare']:.1f} / {num_games} ({knightmare_percentage:.1f}%)")
-    print(f"Random:     {results['random']:.1f} / {num_games} ({random_percentage:.1f}%)")
-    if results["draw"] > 0:
-        print(f"Draws:      {int(results['draw'] / 0.5)} games")
+    for name, score in ranking:
+        print(f"{name + ':':<11} {score:.1f} / {num_games} ({score * pct_per_game:.1f}%)")
+    if draws > 0:
+        print(f"Draws:      {draws} games")
     
     print("=" * 60)
     
-    if results["knightmare"] > results["random"]:
-        print("🏆 KNIGHTMARE WINS THE TOURNAMENT! 🏆")
-    elif results["random"] > results["knightmare"]:
-        print("🏆 RANDOM WINS THE TOURNAMENT! 🏆")
+    if ranking[0][1] > ranking[1][1]:
+        print(f"🏆 {ranking[0][0].upper()} WINS THE TOURNAMENT! 🏆")
     else:
         print("🤝 THE TOURNAMENT IS A DRAW! 🤝")
 
 def main():
     """Main function"""
-    import sys
-    
     # Get number of games from command line
     if len(sys.argv) > 1:
         try:
             num_games = int(sys.argv[1])
-        except:
+        except ValueError:
             num_games = 10
     else:
         num_games = 10
     
+    # Exactly num_games games are dealt to the workers, so it must be positive
+    if num_games < 1:
+        print(f"Number of games must be at least 1, got {num_games}")
+        return
+    
     run_tournament(num_games)
 
 if __name__ == "__main__":
@@ -4,13 +4,31 @@ Simple Web Chess Interface - Direct Integration
 Works directly with the Knightmare bot code without UCI
 """
 
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, request
 import chess
 import chess.svg
 import random
 import time
 import sys
 import os
+import threading
+import gzip
+from dataclasses import dataclass, field
+from queue import Queue, Empty
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+# Prefer orjson for serializing responses
+try:
+    import orjson
+    
+    def dumps_json(payload):
+        return orjson.dumps(payload)
+except ImportError:
+    import json
+    
+    def dumps_json(payload):
+        return json.dumps(payload, separators=(',', ':'))
 
 # Add the current directory to path to import knightmare_bot
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -37,58 +55,136 @@ except Exception as e:
 
 app = Flask(__name__)
 
-# Global game state
-game_board = chess.Board()
-move_history = []
-knightmare = None
+# Alpha-beta search window
+_NEG_INF = -float('inf')
+_POS_INF = float('inf')
+
+# Transposition table shared by Knightmare's minimax searches
+_TT = {}
+
+@dataclass
+class GameState:
+    """Everything about the game in progress"""
+    board: chess.Board = field(default_factory=chess.Board)
+    history: list = field(default_factory=list)
+    bot: object = None
+    revision: int = 0  # bumped on every change to the game, tags /board responses
+    outcome: object = None  # as of the last change to the board, see update_outcome()
+
+# Game state lives on the app so handlers reach it through one lookup
+app.config['STATE'] = GameState()
+_SERVER_ID = os.urandom(4).hex()  # keeps ETags from an earlier server run from matching
+
+# Knightmare thinks in a worker process while the browser renders White's move
+_pool = ProcessPoolExecutor(max_workers=1)
+_pending = None  # (fen, Future) for Knightmare's precomputed reply
+MOVE_TIMEOUT = 10  # seconds /move waits for that reply before playing a random move
 
 def reset_game():
-    global game_board, move_history, knightmare
-    game_board = chess.Board()
-    move_history = []
+    state = app.config['STATE']
+    cancel_pending_move()
+    # Reset in place instead of allocating a new board/list each game
+    state.board.reset()
+    state.history.clear()
+    update_outcome()
+    state.revision += 1
+    _TT.clear()
     if bot_class:
-        knightmare = bot_class()
+        state.bot = bot_class()
 
-def get_knightmare_move(board):
-    """Get move from Knightmare bot"""
-    global knightmare
+def get_knightmare_move(board, copy_board=True):
+    """Get move from Knightmare bot (searching a copy unless the caller
+    hands over a board of its own with copy_board=False)"""
+    state = app.config['STATE']
     
     if not bot_class:
         # Fallback to random if bot not available
-        moves = list(board.legal_moves)
-        return random.choice(moves) if moves else None
+        return get_random_move(board)
     
     try:
-        if not knightmare:
-            knightmare = bot_class()
+        if not state.bot:
+            state.bot = bot_class()
+        knightmare = state.bot
+        
+        # Knightmare only pops moves it pushed itself, so the copy can leave
+        # out the game's move stack
+        search_board = board.copy(stack=False) if copy_board else board
         
         # Try different method names that might exist
         if hasattr(knightmare, 'get_best_move'):
-            return knightmare.get_best_move(board.copy(), max_time=1.0)
+            return knightmare.get_best_move(search_board, max_time=1.0)
         elif hasattr(knightmare, 'get_move'):
-            return knightmare.get_move(board.copy(), 1.0)
+            return knightmare.get_move(search_board, 1.0)
         else:
-            # Try minimax directly
+            # Try minimax directly, deepening iteratively so each depth
+            # searches the previous best move first
             if hasattr(knightmare, 'minimax'):
-                _, move = knightmare.minimax(
-                    board.copy(), 
-                    3,  # depth
-                    -float('inf'), 
-                    float('inf'), 
-                    board.turn == chess.WHITE
-                )
+                if len(_TT) > 200000:
+                    _TT.clear()
+                move = None
+                for depth in range(1, 4):
+                    _, move = knightmare.minimax(
+                        search_board, 
+                        depth, 
+                        _NEG_INF, 
+                        _POS_INF, 
+                        board.turn == chess.WHITE,
+                        tt=_TT,
+                        hashmove=move
+                    )
                 return move
     except Exception as e:
         print(f"Error getting Knightmare move: {e}")
     
     # Fallback to random
-    moves = list(board.legal_moves)
-    return random.choice(moves) if moves else None
+    return get_random_move(board)
+
+def _compute_black(fen):
+    """Compute Knightmare's move for a FEN (runs in the worker process)"""
+    # The board is built here just for the search, so it needn't be copied
+    return get_knightmare_move(chess.Board(fen), copy_board=False)
+
+def submit_pending_move(board):
+    """Start computing Knightmare's reply in the background"""
+    global _pending
+    fen = board.fen()
+    _pending = (fen, _pool.submit(_compute_black, fen))
+
+def cancel_pending_move():
+    """Drop any precomputed Knightmare move"""
+    global _pending
+    if _pending:
+        _pending[1].cancel()
+    _pending = None
+
+def take_pending_move(board):
+    """Get Knightmare's precomputed move, or search now if there is none"""
+    global _pending
+    pending, _pending = _pending, None
+    
+    if pending and pending[0] == board.fen():
+        try:
+            return pending[1].result(timeout=MOVE_TIMEOUT)
+        except TimeoutError:
+            print(f"Background search took over {MOVE_TIMEOUT}s, playing a random move")
+            return get_random_move(board)
+        except Exception as e:
+            print(f"Error in background search: {e}")
+    
+    return get_knightmare_move(board)
+
+def json_response(payload):
+    """Build a JSON response without going through jsonify"""
+    return Response(dumps_json(payload), mimetype='application/json')
 
 def get_random_move(board):
     """Get random move"""
-    moves = list(board.legal_moves)
-    return random.choice(moves) if moves else None
+    # Reservoir sampling picks uniformly without building a list of moves
+    chosen = None
+    for n, move in enumerate(board.generate_legal_moves(), 1):
+        if random.randrange(n) == 0:
+            chosen = move
+    return chosen
 
 HTML = """
 <!DOCTYPE html>
@@ -183,7 +279,7 @@ HTML = """
     
     <div class="container">
         <div class="board-container">
-            <div id="board">Loading...</div>
+            <div id="board"><img id="board-img" width="500" height="500" alt="Chess board"></div>
         </div>
         
         <div class="controls">
@@ -210,131 +306,324 @@ HTML = """
     <script>
         let autoPlay = null;
         
-        function updateBoard() {
-            fetch('/board')
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('board').innerHTML = data.svg;
-                    document.getElementById('status').textContent = data.status;
-                    
-                    // Update move history
-                    let movesHtml = '';
-                    for (let i = 0; i < data.moves.length; i += 2) {
-                        let moveNum = Math.floor(i/2) + 1;
-                        let white = data.moves[i] || '';
-                        let black = data.moves[i+1] || '';
-                        movesHtml += '<div class="move-pair">' + moveNum + '. ' + white + ' ' + black + '</div>';
-                    }
-                    document.getElementById('moves').innerHTML = movesHtml;
-                    document.getElementById('moves').scrollTop = document.getElementById('moves').scrollHeight;
-                    
-                    // Update player indicators
-                    if (data.white_to_move) {
-                        document.getElementById('white-player').className = 'player-indicator active';
-                        document.getElementById('black-player').className = 'player-indicator inactive';
-                    } else {
-                        document.getElementById('white-player').className = 'player-indicator inactive';
-                        document.getElementById('black-player').className = 'player-indicator active';
-                    }
-                    
-                    // Stop auto play if game over
-                    if (data.game_over && autoPlay) {
-                        stopAuto();
-                    }
-                });
+        // The server pushes the board state whenever it changes
+        // Moves already in the history list; the server only sends the
+        // moves from index moves_since on
+        let shownMoves = [];
+        
+        function showMoves(since, newMoves) {
+            const movesEl = document.getElementById('moves');
+            if (since > shownMoves.length) {
+                // Missed some moves, so ask for everything after ours
+                fetch('/board?since=' + shownMoves.length)
+                    .then(response => response.json())
+                    .then(data => showMoves(data.moves_since, data.new_moves));
+                return;
+            }
+            if (since < shownMoves.length) {
+                // Replace the moves from since on (a new game starts over from 0)
+                shownMoves.length = since;
+                while (movesEl.children.length > Math.ceil(since / 2)) {
+                    movesEl.lastElementChild.remove();
+                }
+                if (since % 2) {
+                    movesEl.lastElementChild.textContent = (since + 1) / 2 + '. ' + shownMoves[since - 1];
+                }
+            }
+            for (const move of newMoves) {
+                if (shownMoves.length % 2 === 0) {
+                    const pair = document.createElement('div');
+                    pair.className = 'move-pair';
+                    pair.textContent = (shownMoves.length / 2 + 1) + '. ' + move;
+                    movesEl.appendChild(pair);
+                } else {
+                    movesEl.lastElementChild.textContent += ' ' + move;
+                }
+                shownMoves.push(move);
+            }
+            if (newMoves.length) {
+                movesEl.scrollTop = movesEl.scrollHeight;
+            }
+        }
+        
+        function renderBoard(data) {
+            // The picture only changes with the pieces, and each placement
+            // has its own URL the browser can cache
+            const boardSrc = '/board.svg?fen=' + encodeURIComponent(data.fen);
+            const boardImg = document.getElementById('board-img');
+            if (boardImg.getAttribute('src') !== boardSrc) {
+                boardImg.src = boardSrc;
+            }
+            document.getElementById('status').textContent = data.status;
+            
+            // Update move history
+            showMoves(data.moves_since, data.new_moves);
+            
+            // Update player indicators
+            if (data.white_to_move) {
+                document.getElementById('white-player').className = 'player-indicator active';
+                document.getElementById('black-player').className = 'player-indicator inactive';
+            } else {
+                document.getElementById('white-player').className = 'player-indicator inactive';
+                document.getElementById('black-player').className = 'player-indicator active';
+            }
+            
+            // Stop auto play if game over
+            if (data.game_over && autoPlay) {
+                stopAuto();
+            }
         }
         
         function newGame() {
             stopAuto();
-            fetch('/new_game', {method: 'POST'})
-                .then(() => updateBoard());
+            fetch('/new_game', {method: 'POST'});
         }
         
         function makeMove() {
-            fetch('/move', {method: 'POST'})
+            return fetch('/move', {method: 'POST'})
                 .then(response => response.json())
                 .then(data => {
                     if (data.error) {
                         alert(data.error);
                     }
-                    updateBoard();
                 });
         }
         
+        // Auto play waits for each move before scheduling the next one
+        function autoMove() {
+            makeMove().then(() => {
+                if (autoPlay) {
+                    autoPlay = setTimeout(autoMove, 1000);
+                }
+            });
+        }
+        
         function toggleAuto() {
             if (autoPlay) {
                 stopAuto();
             } else {
                 document.getElementById('auto-btn').textContent = 'Auto Play: ON';
                 document.getElementById('auto-btn').className = 'active';
-                autoPlay = setInterval(makeMove, 1000);
-                makeMove();  // Make first move immediately
+                autoPlay = setTimeout(autoMove, 0);  // Make first move immediately
             }
         }
         
         function stopAuto() {
             if (autoPlay) {
-                clearInterval(autoPlay);
+                clearTimeout(autoPlay);
                 autoPlay = null;
                 document.getElementById('auto-btn').textContent = 'Auto Play: OFF';
                 document.getElementById('auto-btn').className = '';
             }
         }
         
-        // Load board on startup
-        updateBoard();
+        // Load the board on startup and follow every change after that
+        const boardEvents = new EventSource('/stream');
+        boardEvents.onmessage = event => renderBoard(JSON.parse(event.data));
     </script>
 </body>
 </html>
 """
 
+# Status text for drawn/ended games by how they ended
+_OUTCOME_STATUS = {
+    chess.Termination.STALEMATE: "Stalemate - Draw!",
+    chess.Termination.INSUFFICIENT_MATERIAL: "Draw - Insufficient material",
+    chess.Termination.FIFTY_MOVES: "Draw - 50 move rule",
+    chess.Termination.THREEFOLD_REPETITION: "Draw - Threefold repetition",
+}
+
+# Status text for each player, indexed by color (chess.BLACK is 0), and
+# for a game in progress by [turn][in check]
+_PLAYER_NAMES = ("Black (Knightmare)", "White (Random)")
+_TURN_STATUS = tuple((f"{name} to move", f"{name} to move - CHECK!") for name in _PLAYER_NAMES)
+_CHECKMATE_STATUS = tuple(f"Checkmate! {name} wins!" for name in _PLAYER_NAMES)
+
+def tag_response(response, etag):
+    """Tag a /board response so the browser revalidates it with If-None-Match"""
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+def update_outcome():
+    """Work out the game's outcome (claimable draws included) after a change
+    to the board. outcome(claim_draw=True) pushes and pops moves on the
+    board, so only code that changes the board calls this (holding
+    _move_lock, or in reset_game), before it bumps the revision."""
+    state = app.config['STATE']
+    state.outcome = state.board.outcome(claim_draw=True)
+
+def game_outcome():
+    """The game's outcome as worked out by update_outcome(), shared by
+    /move, /board and /stream without touching the board"""
+    return app.config['STATE'].outcome
+
+# Rendered board SVGs keyed by piece placement (the SVG depends on nothing
+# else), so polling an unchanged position doesn't re-render it
+@lru_cache(maxsize=256)
+def render_board_svg(board_fen):
+    """Render the board SVG for a piece placement"""
+    return chess.svg.board(chess.BaseBoard(board_fen), size=500)
+
+@lru_cache(maxsize=256)
+def compress_board_svg(board_fen):
+    """Gzip the board SVG for a piece placement (SVG shrinks several times over)"""
+    return gzip.compress(render_board_svg(board_fen).encode())
+
+# Every game starts from the same placement, so its SVG is rendered at import
+# and kept outside the caches above, where a long game could evict it
+_STARTPOS_SVG = render_board_svg.__wrapped__(chess.STARTING_BOARD_FEN)
+_STARTPOS_SVG_GZIP = gzip.compress(_STARTPOS_SVG.encode())
+
+@app.route('/board.svg')
+def get_board_svg():
+    """The board picture for the placement in ?fen=, which never changes,
+    so the browser keeps it instead of fetching it again"""
+    board_fen = request.args.get('fen', chess.STARTING_BOARD_FEN)
+    gzipped = 'gzip' in request.accept_encodings
+    if board_fen == chess.STARTING_BOARD_FEN:
+        svg = _STARTPOS_SVG_GZIP if gzipped else _STARTPOS_SVG
+    else:
+        try:
+            svg = compress_board_svg(board_fen) if gzipped else render_board_svg(board_fen)
+        except ValueError:
+            return Response('Invalid board FEN', status=400)
+    
+    response = Response(svg, mimetype='image/svg+xml')
+    if gzipped:
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/')
 def index():
-    return render_template_string(HTML)
+    # The page has no template variables, so skip Jinja and send it as is
+    return Response(HTML, mimetype='text/html')
 
-@app.route('/board')
-def get_board():
-    global game_board, move_history
-    
-    svg = chess.svg.board(game_board, size=500)
+def board_state(since=0):
+    """Collect what the page shows for the current game, with the moves
+    from index since on (the client already has the earlier ones)"""
+    state = app.config['STATE']
+    game_board = state.board
+    since = min(max(since, 0), len(state.history))
     
-    # Determine game status
-    if game_board.is_checkmate():
-        winner = "White (Random)" if game_board.turn == chess.BLACK else "Black (Knightmare)"
-        status = f"Checkmate! {winner} wins!"
-    elif game_board.is_stalemate():
-        status = "Stalemate - Draw!"
-    elif game_board.is_insufficient_material():
-        status = "Draw - Insufficient material"
-    elif game_board.is_fifty_moves():
-        status = "Draw - 50 move rule"
-    elif game_board.is_game_over():
-        status = "Game Over"
+    # Determine game status (one outcome() call covers every way a game ends)
+    outcome = game_outcome()
+    if outcome is None:
+        status = _TURN_STATUS[game_board.turn][game_board.is_check()]
+    elif outcome.termination == chess.Termination.CHECKMATE:
+        status = _CHECKMATE_STATUS[outcome.winner]
     else:
-        turn = "White (Random)" if game_board.turn == chess.WHITE else "Black (Knightmare)"
-        status = f"{turn} to move"
-        if game_board.is_check():
-            status += " - CHECK!"
+        status = _OUTCOME_STATUS.get(outcome.termination, "Game Over")
     
-    return jsonify({
-        'svg': svg,
+    return {
+        'fen': game_board.board_fen(),
         'status': status,
-        'moves': move_history,
-        'game_over': game_board.is_game_over(),
+        'moves_since': since,
+        'new_moves': state.history[since:],
+        'game_over': outcome is not None,
         'white_to_move': game_board.turn == chess.WHITE
-    })
+    }
+
+@app.route('/board')
+def get_board():
+    state = app.config['STATE']
+    
+    # Unchanged since the client's copy, so skip building the response
+    etag = f"{_SERVER_ID}-{state.revision}"
+    if request.if_none_match.contains(etag):
+        return tag_response(Response(status=304), etag)
+    
+    since = request.args.get('since', 0, type=int)
+    return tag_response(json_response(board_state(since)), etag)
+
+# Queues of /stream clients waiting for the next board state
+_subscribers = []
+_subscribers_lock = threading.Lock()
+_moves_broadcast = 0  # length of the move history at the last broadcast
+
+def board_event(since=0):
+    """Format the current board state as a server-sent event"""
+    data = dumps_json(board_state(since))
+    if isinstance(data, bytes):  # orjson
+        data = data.decode()
+    return f"data: {data}\n\n"
+
+def broadcast_board():
+    """Push the current board state to every /stream client"""
+    global _moves_broadcast
+    if not _subscribers:
+        return
+    with _subscribers_lock:
+        # Only the moves made since the last broadcast
+        event = board_event(_moves_broadcast)
+        _moves_broadcast = len(app.config['STATE'].history)
+        for updates in _subscribers:
+            updates.put(event)
+
+@app.route('/stream')
+def stream():
+    """Server-sent events: the board state now and after every change"""
+    def events():
+        updates = Queue()
+        with _subscribers_lock:
+            _subscribers.append(updates)
+        try:
+            yield board_event()
+            while True:
+                try:
+                    yield updates.get(timeout=15)
+                except Empty:
+                    # Comment line; lets a closed connection be noticed
+                    yield ": keepalive\n\n"
+        finally:
+            with _subscribers_lock:
+                _subscribers.remove(updates)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+# The dev server answers each request on its own thread, so /board polls
+# are served while a bot thinks; this keeps /move calls from overlapping
+# each other or a new game
+_move_lock = threading.Lock()
 
 @app.route('/new_game', methods=['POST'])
 def new_game():
-    reset_game()
-    return jsonify({'success': True})
+    # Wait for a move in progress, so it isn't played on the new board
+    with _move_lock:
+        reset_game()
+    broadcast_board()
+    return json_response({'success': True})
 
 @app.route('/move', methods=['POST'])
 def make_move():
-    global game_board, move_history
+    # Auto-play can fire again before a slow move returns; don't start a
+    # second search for the same position
+    if not _move_lock.acquire(blocking=False):
+        return json_response({'error': 'Move already in progress'})
+    state = app.config['STATE']
+    try:
+        revision = state.revision
+        response = play_next_move()
+    finally:
+        _move_lock.release()
     
-    if game_board.is_game_over():
-        return jsonify({'error': 'Game is over'})
+    if state.revision != revision:
+        broadcast_board()
+    return response
+
+def play_next_move():
+    """Play the move for the side to move and record it"""
+    state = app.config['STATE']
+    game_board = state.board
+    
+    # Claimable draws end the game too, matching the status /board shows
+    if game_outcome() is not None:
+        return json_response({'error': 'Game is over'})
     
     try:
         # Determine whose turn it is
@@ -344,28 +633,34 @@ def make_move():
             player = "Random"
         else:
             # Knightmare plays Black
-            move = get_knightmare_move(game_board)
+            move = take_pending_move(game_board)
             player = "Knightmare"
         
-        if move and move in game_board.legal_moves:
-            san = game_board.san(move)
-            game_board.push(move)
-            move_history.append(f"{player}: {san}")
-            return jsonify({'success': True})
+        if move is not None and game_board.is_legal(move):
+            san = game_board.san_and_push(move)
+            state.history.append(f"{player}: {san}")
+            update_outcome()
+            state.revision += 1
+            
+            # Start Knightmare's reply while the client renders this move
+            if game_board.turn == chess.BLACK and game_outcome() is None:
+                submit_pending_move(game_board)
+            return json_response({'success': True})
         else:
-            return jsonify({'error': f'{player} failed to make valid move'})
+            return json_response({'error': f'{player} failed to make valid move'})
             
     except Exception as e:
         print(f"Error in make_move: {e}")
+        cancel_pending_move()
         # Fallback to random move
-        moves = list(game_board.legal_moves)
-        if moves:
-            move = random.choice(moves)
-            san = game_board.san(move)
-            game_board.push(move)
-            move_history.append(f"Emergency: {san}")
-            return jsonify({'success': True})
-        return jsonify({'error': str(e)})
+        move = get_random_move(game_board)
+        if move:
+            san = game_board.san_and_push(move)
+            state.history.append(f"Emergency: {san}")
+            update_outcome()
+            state.revision += 1
+            return json_response({'success': True})
+        return json_response({'error': str(e)})
 
 if __name__ == '__main__':
     # Initialize
@@ -384,4 +679,7 @@ if __name__ == '__main__':
     print("\nOpen your browser to: http://localhost:5001")
     print("="*60 + "\n")
     
-    app.run(debug=False, port=5001)
\ No newline at end of file
+    try:
+        app.run(debug=False, port=5001, threaded=True)
+    finally:
+        _pool.shutdown(cancel_futures=True)
\ No newline at end of file
@@ -6,297 +6,483 @@ Optimized for readability per assignment requirements
 """
 
 import chess
-import networkx as nx
+import matplotlib
+matplotlib.use("Agg")  # Figures are only saved to files, so skip GUI backend setup
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from matplotlib.patches import FancyBboxPatch, Circle
+from matplotlib.collections import LineCollection, PatchCollection
+import os
 import sys
+import heapq
+import pickle
+from pathlib import Path
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# Move-ordering constants: victim values indexed by piece type, and the
+# central squares as a bitboard
+_PIECE_VALUES_MVV = (0, 1, 3, 3, 5, 9, 0)
+_CENTER_MASK = chess.BB_E4 | chess.BB_D4 | chess.BB_E5 | chess.BB_D5 | chess.BB_C5 | chess.BB_C4
+
+# Output figures: (filename, title, figsize, show_pruning, show_annotations)
+FIGURES = [
+    ("1_minimax_standard.png",
+     "Minimax Tree - Queen's Gambit Declined\n(Depth 4 - Top 3 Moves per Node)",
+     (20, 14), False, False),
+    ("2_alphabeta_pruning.png",
+     "Alpha-Beta Pruning - Queen's Gambit Declined\n(Showing Pruned Branches with Red X)",
+     (20, 14), True, False),
+    ("3_alphabeta_annotated.png",
+     "Alpha-Beta Pruning with α/β Values\n(Ready for Manual Annotation)",
+     (20, 16), True, True),
+]
+
+# The searched position and depth are fixed, so the built tree is cached
+# on disk next to this script; bump the version string whenever the search changes
+TREE_CACHE_FILE = Path(__file__).resolve().with_name(".qgd_tree_d4.pkl")
+TREE_CACHE_VERSION = (chess.__version__, "depth4_top3_v3")
+
+# Static evaluations keyed by position (board._transposition_key())
+_CACHE = {}
 
 def simple_evaluate(board):
     """Simple evaluation function for visualization"""
+    key = board._transposition_key()
+    value = _CACHE.get(key)
+    if value is not None:
+        return value
+    
+    value = _evaluate_position(board)
+    _CACHE[key] = value
+    return value
+
+def _evaluate_position(board):
+    """Evaluate a position from the side to move's point of view"""
     if board.is_checkmate():
         return -10000 if board.turn else 10000
     if board.is_stalemate():
         return 0
     
-    # Material count
-    piece_values = {
-        chess.PAWN: 100,
-        chess.KNIGHT: 320,
-        chess.BISHOP: 330,
-        chess.ROOK: 500,
-        chess.QUEEN: 900,
-        chess.KING: 0
-    }
-    
-    value = 0
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            piece_value = piece_values[piece.piece_type]
-            if piece.color == chess.WHITE:
-                value += piece_value
-            else:
-                value -= piece_value
+    # Material count straight from the piece bitboards
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    value = (100 * (chess.popcount(board.pawns & white) - chess.popcount(board.pawns & black))
+             + 320 * (chess.popcount(board.knights & white) - chess.popcount(board.knights & black))
+             + 330 * (chess.popcount(board.bishops & white) - chess.popcount(board.bishops & black))
+             + 500 * (chess.popcount(board.rooks & white) - chess.popcount(board.rooks & black))
+             + 900 * (chess.popcount(board.queens & white) - chess.popcount(board.queens & black)))
     
     # Small bonus for mobility
-    value += len(list(board.legal_moves)) * 5
+    value += board.legal_moves.count() * 5
     
     return value if board.turn == chess.WHITE else -value
 
+# Parsed moves keyed by UCI string
+_UCI_CACHE = {}
+
+def uci_to_move(uci):
+    """Parse a UCI move string, reusing previously parsed moves"""
+    move = _UCI_CACHE.get(uci)
+    if move is None:
+        move = chess.Move.from_uci(uci)
+        _UCI_CACHE[uci] = move
+    return move
+
 def create_minimax_visualization():
     """Create minimax tree from Queen's Gambit Declined"""
+    _CACHE.clear()
     
     # Set up Queen's Gambit Declined position
     board = chess.Board()
     moves = ['d2d4', 'd7d5', 'c2c4', 'e7e6']
     for move_uci in moves:
-        board.push(chess.Move.from_uci(move_uci))
+        board.push(uci_to_move(move_uci))
     
     print("Position: Queen's Gambit Declined")
     print("After: 1.d4 d5 2.c4 e6")
     print(board)
     print()
     
-    # Create THREE separate figures for better clarity
-    # Figure 1: Standard Minimax
-    fig1 = plt.figure(figsize=(20, 14))
-    ax1 = fig1.add_subplot(111)
-    ax1.set_title("Minimax Tree - Queen's Gambit Declined\n(Depth 4 - Top 3 Moves per Node)", 
-                  fontsize=18, fontweight='bold', pad=20)
-    draw_minimax_tree(ax1, board, show_pruning=False, show_annotations=False)
-    plt.tight_layout()
-    plt.savefig("1_minimax_standard.png", dpi=150, bbox_inches='tight')
-    print("✓ Saved: 1_minimax_standard.png")
-    
-    # Figure 2: With Alpha-Beta Pruning
-    fig2 = plt.figure(figsize=(20, 14))
-    ax2 = fig2.add_subplot(111)
-    ax2.set_title("Alpha-Beta Pruning - Queen's Gambit Declined\n(Showing Pruned Branches with Red X)", 
-                  fontsize=18, fontweight='bold', pad=20)
-    draw_minimax_tree(ax2, board, show_pruning=True, show_annotations=False)
-    plt.tight_layout()
-    plt.savefig("2_alphabeta_pruning.png", dpi=150, bbox_inches='tight')
-    print("✓ Saved: 2_alphabeta_pruning.png")
-    
-    # Figure 3: With Manual Annotation Guide
-    fig3 = plt.figure(figsize=(20, 16))
-    ax3 = fig3.add_subplot(111)
-    ax3.set_title("Alpha-Beta Pruning with α/β Values\n(Ready for Manual Annotation)", 
-                  fontsize=18, fontweight='bold', pad=20)
-    draw_minimax_tree(ax3, board, show_pruning=True, show_annotations=True)
-    plt.tight_layout()
-    plt.savefig("3_alphabeta_annotated.png", dpi=150, bbox_inches='tight')
-    print("✓ Saved: 3_alphabeta_annotated.png")
-    
-    plt.show()
+    # Build the tree once (or load it from the cache); all three figures
+    # are drawn from it
+    tree_data = load_tree(board)
+    
+    # Render the THREE figures in parallel (savefig dominates the run time)
+    with ProcessPoolExecutor(max_workers=len(FIGURES)) as pool:
+        futures = [
+            pool.submit(render_figure, tree_data, title, figsize,
+                        show_pruning, show_annotations, filename)
+            for filename, title, figsize, show_pruning, show_annotations in FIGURES
+        ]
+        for future in futures:
+            print(f"✓ Saved: {future.result()}")
+
+def load_tree(board):
+    """Load the prebuilt tree from disk, building and caching it if needed"""
+    # The cached tree is only reused for the position it was built from
+    version_key = (TREE_CACHE_VERSION, board.fen())
+    if TREE_CACHE_FILE.exists():
+        try:
+            version, tree_data = pickle.loads(TREE_CACHE_FILE.read_bytes())
+            if version == version_key:
+                print(f"Loaded cached tree from {TREE_CACHE_FILE}")
+                return tree_data
+        except Exception as e:
+            print(f"Ignoring unreadable tree cache: {e}")
+    
+    tree_data = build_tree(board, show_annotations=True)
+    TREE_CACHE_FILE.write_bytes(pickle.dumps((version_key, tree_data)))
+    return tree_data
+
+def render_figure(tree_data, title, figsize, show_pruning, show_annotations, filename):
+    """Render one tree figure and save it to filename"""
+    fig = plt.figure(figsize=figsize)
+    ax = fig.add_subplot(111)
+    ax.set_title(title, fontsize=18, fontweight='bold', pad=20)
+    render_tree(ax, tree_data, show_pruning=show_pruning, show_annotations=show_annotations)
+    fig.tight_layout()
+    fig.savefig(filename, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return filename
 
 def draw_minimax_tree(ax, board, show_pruning=False, show_annotations=False):
     """Draw a minimax tree with clear layout and readable labels"""
-    G = nx.DiGraph()
+    render_tree(ax, build_tree(board, show_annotations=show_annotations),
+                show_pruning=show_pruning, show_annotations=show_annotations)
+
+def build_tree(board, show_annotations=False, depth=4, branch=None):
+    """Search the tree and return the data needed to draw it, with and
+    without alpha-beta pruning.
+    
+    The alpha-beta search runs first; the branches it cuts off are then
+    searched in full in worker processes and grafted back in. A worker's
+    call passes branch (the cut-off node's move, place among its siblings
+    and the move-ordering state at the cutoff) to build just that branch.
+    """
+    # Tree edges: parent -> child ids, plus attributes per (parent, child)
+    children = defaultdict(list)
+    edge_attrs = {}
     
     # Store additional node information
     node_info = {}
     pruning_info = {}
-    alpha_beta_values = {}  # Store α/β at each node
+    alpha_beta_values = {}  # Store α/β at each node (only drawn with annotations)
     
     # Build tree structure
     node_counter = [0]
+    tt = {}  # (position key, depth) -> exact negamax value
+    levels = defaultdict(list)  # tree level -> node ids, left to right
+    max_depth = depth
+    killers = defaultdict(lambda: [None, None])  # depth -> two quiet cutoff moves
+    history = defaultdict(int)  # (from, to) -> cutoff score
+    deferred = []  # (node id, board, depth, branch) of cut-off branches
+    if branch is not None:
+        killers.update(branch['killers'])
+        history.update(branch['history'])
+        tt.update(branch['tt'])
     
     def build_node(board, depth, parent_id=None, alpha=-float('inf'), beta=float('inf'), 
-                   move_made=None, position_in_parent=0, total_siblings=1):
-        """Recursively build tree nodes"""
+                   move_made=None, position_in_parent=0, total_siblings=1,
+                   live=True, pruned=False):
+        """Recursively build tree nodes (negamax), returning the node's
+        (minimax value, alpha-beta value) for the side to move.
+        
+        Branches cut off by pruning are still searched (not live) so the
+        unpruned figure can show their values; the pruned figures hide them.
+        """
         node_id = node_counter[0]
         node_counter[0] += 1
+        levels[max_depth - depth].append(node_id)
+        
+        # Values are searched from the side to move's view but shown from
+        # the root's (MAX) view, so MIN nodes flip signs and swap α/β
+        is_max_node = depth % 2 == 0
+        sign = 1 if is_max_node else -1
+        shown_alpha, shown_beta = (alpha, beta) if is_max_node else (-beta, -alpha)
         
         # Store alpha/beta values
-        alpha_beta_values[node_id] = {'alpha': alpha, 'beta': beta}
+        if show_annotations and live:
+            alpha_beta_values[node_id] = {'alpha': shown_alpha, 'beta': shown_beta}
         
         # Evaluate position
         value = simple_evaluate(board)
         
         # Determine node type
         is_leaf = depth == 0 or board.is_game_over()
-        is_max_node = depth % 2 == 0
         
         # Store node information
         node_info[node_id] = {
-            'value': value if is_leaf else None,
+            'value': sign * value if is_leaf else None,
             'final_value': None,
+            'ab_value': None,
             'is_max': is_max_node,
             'is_leaf': is_leaf,
+            'is_pruned': pruned,
+            'in_pruned_branch': not live and not pruned,
             'depth': depth,
-            'alpha': alpha,
-            'beta': beta,
+            'alpha': shown_alpha,
+            'beta': shown_beta,
             'position': position_in_parent,
             'total_siblings': total_siblings,
             'move_made': move_made
         }
         
-        G.add_node(node_id)
-        
         # Connect to parent
         if parent_id is not None:
-            G.add_edge(parent_id, node_id, move=move_made)
+            children[parent_id].append(node_id)
+            edge_attrs[(parent_id, node_id)] = {'move': move_made, 'pruned': pruned}
         
-        # Generate children if not leaf
-        if not is_leaf and depth > 0:
-            moves = list(board.legal_moves)
-            
-            # Score and select top 3 moves
-            scored_moves = []
-            for move in moves:
-                score = 0
-                # Prioritize captures
-                if board.is_capture(move):
-                    victim = board.piece_at(move.to_square)
-                    if victim:
-                        piece_values = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3,
-                                      chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0}
-                        score += piece_values[victim.piece_type] * 100
-                
-                # Prioritize center moves
-                if move.to_square in [chess.E4, chess.D4, chess.E5, chess.D5, chess.C5, chess.C4]:
-                    score += 50
-                
-                # Check if move gives check
-                board.push(move)
-                if board.is_check():
-                    score += 75
-                board.pop()
-                
-                scored_moves.append((score, move))
+        if is_leaf:
+            node_info[node_id]['final_value'] = sign * value
+            node_info[node_id]['ab_value'] = sign * value
+            return value, value
+        
+        deferred_before = len(deferred)
+        
+        # Reuse the result of a transposed position instead of expanding it.
+        # The QGD tree drawn here has no transpositions within depth 4; the
+        # table is kept for build_tree on other positions, where they occur.
+        # Every stored node was searched to completion, so values are exact
+        # and the depth in the key is the only check needed.
+        tt_key = (board._transposition_key(), depth)
+        tt_value = tt.get(tt_key)
+        if tt_value is not None:
+            node_info[node_id]['is_leaf'] = True
+            node_info[node_id]['value'] = sign * tt_value
+            node_info[node_id]['final_value'] = sign * tt_value
+            node_info[node_id]['ab_value'] = sign * tt_value
+            return tt_value, tt_value
+        
+        # Score and select top 3 moves
+        scored_moves = []
+        enemy = board.occupied_co[not board.turn]
+        for idx, move in enumerate(board.legal_moves):
+            score = 0
+            # Prioritize captures (en passant lands on an empty square and
+            # scores nothing, as before)
+            if chess.BB_SQUARES[move.to_square] & enemy:
+                score += _PIECE_VALUES_MVV[board.piece_type_at(move.to_square)] * 100
             
-            # Sort and take top 3 moves
-            scored_moves.sort(key=lambda x: x[0], reverse=True)
-            moves_to_show = [m for _, m in scored_moves[:3]]  # EXACTLY 3 moves
+            # Prioritize center moves
+            if chess.BB_SQUARES[move.to_square] & _CENTER_MASK:
+                score += 50
             
-            # PRE-COMPUTE all move SANs before making any moves
-            moves_san_list = []
-            for move in moves_to_show:
-                moves_san_list.append(board.san(move))
+            # Check if move gives check (without making the move)
+            if board.gives_check(move):
+                score += 75
             
-            children_values = []
-            pruned_at_child = None
+            # Killer moves and history heuristic from earlier cutoffs
+            if move == killers[depth][0]:
+                score += 9000
+            elif move == killers[depth][1]:
+                score += 8000
+            score += history[(move.from_square, move.to_square)] // 64
             
-            for i, (move, move_san) in enumerate(zip(moves_to_show, moves_san_list)):
-                board.push(move)
-                
-                # Check for pruning
-                should_prune = False
-                if show_pruning and i > 0:  # Can only prune after first child
-                    if is_max_node and len(children_values) > 0:
-                        current_max = max(children_values)
-                        if current_max >= beta:
-                            should_prune = True
-                            pruned_at_child = i
-                            pruning_info[node_id] = {
-                                'reason': f'β-cutoff: max={current_max} ≥ β={beta}',
-                                'at_child': i,
-                                'alpha': alpha,
-                                'beta': beta,
-                                'value': current_max
-                            }
-                    elif not is_max_node and len(children_values) > 0:
-                        current_min = min(children_values)
-                        if current_min <= alpha:
-                            should_prune = True
-                            pruned_at_child = i
-                            pruning_info[node_id] = {
-                                'reason': f'α-cutoff: min={current_min} ≤ α={alpha}',
-                                'at_child': i,
-                                'alpha': alpha,
-                                'beta': beta,
-                                'value': current_min
-                            }
-                
-                if should_prune:
-                    board.pop()  # Pop the current move first
-                    
-                    # Add pruned node for current move
-                    pruned_id = node_counter[0]
-                    node_counter[0] += 1
-                    node_info[pruned_id] = {
-                        'is_pruned': True,
-                        'is_leaf': True,
-                        'depth': depth - 1,
-                        'position': i,
-                        'total_siblings': len(moves_to_show)
-                    }
-                    G.add_node(pruned_id)
-                    G.add_edge(node_id, pruned_id, move=move_san, pruned=True)
-                    
-                    # Prune remaining children too
-                    for j in range(i + 1, len(moves_to_show)):
-                        pruned_id = node_counter[0]
-                        node_counter[0] += 1
-                        node_info[pruned_id] = {
-                            'is_pruned': True,
-                            'is_leaf': True,
-                            'depth': depth - 1,
-                            'position': j,
-                            'total_siblings': len(moves_to_show)
-                        }
-                        G.add_node(pruned_id)
-                        G.add_edge(node_id, pruned_id, move=moves_san_list[j], pruned=True)
-                    break
+            # -idx keeps generation order among equal scores
+            scored_moves.append((score, -idx, move))
+        
+        # Take top 3 moves
+        top_moves = heapq.nlargest(3, scored_moves)
+        moves_to_show = [m for _, _, m in top_moves]  # EXACTLY 3 moves
+        
+        best_value = -float('inf')
+        best_ab_value = -float('inf')
+        best_ab_move = None
+        cut_off = not live
+        
+        for i, move in enumerate(moves_to_show):
+            # Can only prune after the first child
+            if not cut_off and i > 0 and best_ab_value >= beta:
+                cut_off = True
+                shown_value = sign * best_ab_value
+                if is_max_node:
+                    reason = f'β-cutoff: max={shown_value} ≥ β={shown_beta}'
                 else:
-                    # Recursively build child
-                    child_id = build_node(board, depth - 1, node_id, alpha, beta, 
-                                        move_san, i, len(moves_to_show))
-                    child_value = node_info[child_id].get('final_value', node_info[child_id]['value'])
-                    children_values.append(child_value)
-                    
-                    # Update alpha-beta
-                    if is_max_node:
-                        alpha = max(alpha, child_value)
-                        alpha_beta_values[node_id]['alpha'] = alpha
-                    else:
-                        beta = min(beta, child_value)
-                        alpha_beta_values[node_id]['beta'] = beta
+                    reason = f'α-cutoff: min={shown_value} ≤ α={shown_alpha}'
+                pruning_info[node_id] = {
+                    'reason': reason,
+                    'at_child': i,
+                    'alpha': shown_alpha,
+                    'beta': shown_beta,
+                    'value': shown_value
+                }
                 
+                # Remember the move that produced the cutoff value
+                if not board.is_capture(best_ab_move):
+                    if best_ab_move != killers[depth][0]:
+                        killers[depth][1] = killers[depth][0]
+                        killers[depth][0] = best_ab_move
+                    history[(best_ab_move.from_square, best_ab_move.to_square)] += depth * depth
+            
+            # san_and_push reuses the push instead of san() pushing and popping again
+            move_san = board.san_and_push(move)
+            
+            # Branches cut off here don't affect the alpha-beta search, so
+            # they are searched in parallel once it is done, with the move
+            # ordering they would have seen now
+            if cut_off and live:
+                child_id = node_counter[0]
+                node_counter[0] += 1
+                children[node_id].append(child_id)
+                edge_attrs[(node_id, child_id)] = {'move': move_san, 'pruned': True}
+                deferred.append((child_id, board.copy(), depth - 1, {
+                    'move_made': move_san,
+                    'position': i,
+                    'total_siblings': len(moves_to_show),
+                    'killers': {d: list(k) for d, k in killers.items()},
+                    'history': dict(history),
+                    'tt': dict(tt),
+                }))
                 board.pop()
+                continue
             
-            # Set node's final value
-            if children_values:
-                if is_max_node:
-                    node_info[node_id]['final_value'] = max(children_values)
-                else:
-                    node_info[node_id]['final_value'] = min(children_values)
-        else:
-            node_info[node_id]['final_value'] = value
+            # Recursively build child with the negated window; pruned
+            # children are searched with the full window instead
+            if cut_off:
+                child_value, _ = build_node(board, depth - 1, node_id,
+                                            move_made=move_san, position_in_parent=i,
+                                            total_siblings=len(moves_to_show),
+                                            live=False, pruned=live)
+            else:
+                child_value, child_ab_value = build_node(board, depth - 1, node_id, -beta, -alpha,
+                                                         move_san, i, len(moves_to_show))
+            board.pop()
+            
+            best_value = max(best_value, -child_value)
+            if cut_off:
+                continue
+            
+            if -child_ab_value > best_ab_value:
+                best_ab_value = -child_ab_value
+                best_ab_move = move
+            
+            # Update alpha-beta
+            alpha = max(alpha, -child_ab_value)
+            shown_alpha, shown_beta = (alpha, beta) if is_max_node else (-beta, -alpha)
+            if show_annotations:
+                alpha_beta_values[node_id] = {'alpha': shown_alpha, 'beta': shown_beta}
+        
+        # Set node's final values
+        if not live:
+            best_ab_value = best_value
+        node_info[node_id]['final_value'] = sign * best_value
+        node_info[node_id]['ab_value'] = sign * best_ab_value
+        # A subtree with branches still to search has no final value yet
+        if len(deferred) == deferred_before:
+            tt[tt_key] = best_value
         
-        return node_id
+        return best_value, best_ab_value
     
     # Build the tree
-    root = build_node(board, depth=4)
+    root = node_counter[0]
+    if branch is None:
+        build_node(board, depth=max_depth)
+    else:
+        build_node(board, depth=max_depth, move_made=branch['move_made'],
+                   position_in_parent=branch['position'],
+                   total_siblings=branch['total_siblings'], live=False, pruned=True)
+    
+    if deferred:
+        graft_branches(deferred, children, edge_attrs, node_info, node_counter[0])
+        
+        # Grafted branches change the minimax values above them, and their
+        # nodes belong in the levels at their place in the tree
+        update_minimax_values(root, children, node_info)
+        levels = defaultdict(list)
+        stack = [root]
+        while stack:
+            node_id = stack.pop()
+            levels[max_depth - node_info[node_id]['depth']].append(node_id)
+            stack.extend(reversed(children.get(node_id, ())))
+    
+    return {
+        'children': dict(children),
+        'edge_attrs': edge_attrs,
+        'node_info': node_info,
+        'pruning_info': pruning_info,
+        'alpha_beta_values': alpha_beta_values,
+        'levels': dict(levels),
+        'root': root
+    }
+
+def graft_branches(deferred, children, edge_attrs, node_info, next_id):
+    """Search the cut-off branches in parallel and add them to the tree,
+    renumbering their nodes from next_id"""
+    with ProcessPoolExecutor(max_workers=min(len(deferred), os.cpu_count() or 1)) as pool:
+        futures = [(node_id, pool.submit(build_tree, branch_board, depth=depth, branch=branch))
+                   for node_id, branch_board, depth, branch in deferred]
+        
+        for node_id, future in futures:
+            branch_data = future.result()
+            
+            # The branch's root is the node already linked under its parent
+            ids = {branch_data['root']: node_id}
+            for local_id in branch_data['node_info']:
+                if local_id not in ids:
+                    ids[local_id] = next_id
+                    next_id += 1
+            
+            for local_id, info in branch_data['node_info'].items():
+                node_info[ids[local_id]] = info
+            for parent_id, child_ids in branch_data['children'].items():
+                children[ids[parent_id]] = [ids[c] for c in child_ids]
+            for (parent_id, child_id), attrs in branch_data['edge_attrs'].items():
+                edge_attrs[(ids[parent_id], ids[child_id])] = attrs
+
+def update_minimax_values(node_id, children, node_info):
+    """Recompute final_value (shown from MAX's view) below node_id from its leaves"""
+    child_ids = children.get(node_id)
+    if not child_ids:
+        return node_info[node_id]['final_value']
+    
+    values = [update_minimax_values(c, children, node_info) for c in child_ids]
+    value = max(values) if node_info[node_id]['is_max'] else min(values)
+    node_info[node_id]['final_value'] = value
+    return value
+
+def render_tree(ax, tree_data, show_pruning=False, show_annotations=False):
+    """Draw a tree built by build_tree onto ax"""
+    children = tree_data['children']
+    edge_attrs = tree_data['edge_attrs']
+    node_info = tree_data['node_info']
+    pruning_info = tree_data['pruning_info']
+    alpha_beta_values = tree_data['alpha_beta_values']
+    levels = tree_data['levels']
+    root = tree_data['root']
+    
+    # The pruned figures show alpha-beta values and hide the inside of cut
+    # off branches; the unpruned figure draws every branch with its value
+    value_key = 'ab_value' if show_pruning else 'final_value'
+    if show_pruning:
+        levels = {level: [n for n in node_ids if not node_info[n]['in_pruned_branch']]
+                  for level, node_ids in levels.items()}
+        node_info = {n: info for n, info in node_info.items() if not info['in_pruned_branch']}
+        edge_attrs = {edge: attrs for edge, attrs in edge_attrs.items() if edge[1] in node_info}
     
     # Calculate positions for better layout
-    pos = calculate_tree_positions(G, node_info, root)
+    pos = calculate_tree_positions(levels)
     
-    # Draw edges
-    for edge in G.edges():
-        edge_data = G.edges[edge]
+    # Draw edges (collected so each style is a single artist)
+    normal_segments, normal_colors, normal_widths = [], [], []
+    pruned_segments, edge_marks = [], []
+    for edge, edge_data in edge_attrs.items():
         start_pos = pos[edge[0]]
         end_pos = pos[edge[1]]
         
         if edge_data.get('pruned', False) and show_pruning:
-            # Draw pruned edges
-            ax.plot([start_pos[0], end_pos[0]], [start_pos[1], end_pos[1]], 
-                   'r--', linewidth=2.5, alpha=0.6)
-            # Add X mark
-            mid_x = (start_pos[0] + end_pos[0]) / 2
-            mid_y = (start_pos[1] + end_pos[1]) / 2
-            ax.plot(mid_x, mid_y, 'rx', markersize=25, markeredgewidth=4)
+            # Pruned edge with an X mark
+            pruned_segments.append((start_pos, end_pos))
+            edge_marks.append(((start_pos[0] + end_pos[0]) / 2, (start_pos[1] + end_pos[1]) / 2))
         else:
-            # Draw normal edges
-            line_width = 3 if edge[0] == root and node_info[edge[1]].get('final_value') == node_info[root].get('final_value') else 1.5
-            line_color = 'green' if line_width == 3 else 'black'
-            ax.plot([start_pos[0], end_pos[0]], [start_pos[1], end_pos[1]], 
-                   color=line_color, linewidth=line_width)
+            # Normal edge
+            line_width = 3 if edge[0] == root and node_info[edge[1]].get(value_key) == node_info[root].get(value_key) else 1.5
+            normal_segments.append((start_pos, end_pos))
+            normal_colors.append('green' if line_width == 3 else 'black')
+            normal_widths.append(line_width)
         
         # Add move labels with better positioning
-        if 'move' in edge_data and not edge_data.get('pruned', False):
+        if 'move' in edge_data and not (edge_data.get('pruned', False) and show_pruning):
             mid_x = (start_pos[0] + end_pos[0]) / 2
             mid_y = (start_pos[1] + end_pos[1]) / 2
             
@@ -307,37 +493,43 @@ def draw_minimax_tree(ax, board, show_pruning=False, show_annotations=False):
                    fontsize=13, ha='center', color='blue',
                    bbox=bbox_props, fontweight='bold')
     
-    # Draw nodes
-    for node in G.nodes():
+    ax.add_collection(LineCollection(normal_segments, colors=normal_colors,
+                                     linewidths=normal_widths))
+    if pruned_segments:
+        ax.add_collection(LineCollection(pruned_segments, colors='r', linestyles='--',
+                                         linewidths=2.5, alpha=0.6))
+        ax.plot(*zip(*edge_marks), 'rx', markersize=25, markeredgewidth=4)
+    
+    # Draw nodes (shapes are collected and added once at the end)
+    rect_patches, circle_patches, pruned_marks = [], [], []
+    for node in node_info:
         x, y = pos[node]
         info = node_info[node]
         
-        if info.get('is_pruned', False):
+        if info.get('is_pruned', False) and show_pruning:
             # Pruned node - red X
-            ax.plot(x, y, 'rx', markersize=30, markeredgewidth=5)
+            pruned_marks.append((x, y))
             ax.text(x, y - 0.6, 'PRUNED', fontsize=11, ha='center', 
                    color='red', fontweight='bold')
         elif info.get('is_leaf', False):
             # Leaf node - green rectangle
-            rect = FancyBboxPatch((x - 0.45, y - 0.3), 0.9, 0.6,
-                                 boxstyle="round,pad=0.05",
-                                 facecolor='lightgreen',
-                                 edgecolor='darkgreen', linewidth=2.5)
-            ax.add_patch(rect)
+            rect_patches.append(FancyBboxPatch((x - 0.45, y - 0.3), 0.9, 0.6,
+                                               boxstyle="round,pad=0.05",
+                                               facecolor='lightgreen',
+                                               edgecolor='darkgreen', linewidth=2.5))
             # Show value
-            value = info.get('final_value', info.get('value', '?'))
+            value = info.get(value_key, info.get('value', '?'))
             ax.text(x, y, str(value), ha='center', va='center', 
                    fontsize=14, fontweight='bold')
         else:
             # Internal node
             is_max = info.get('is_max', False)
             color = 'lightblue' if is_max else 'lightcoral'
-            circle = Circle((x, y), 0.4, facecolor=color, 
-                          edgecolor='black', linewidth=2.5, zorder=3)
-            ax.add_patch(circle)
+            circle_patches.append(Circle((x, y), 0.4, facecolor=color, 
+                                         edgecolor='black', linewidth=2.5))
             
             # Show value
-            value = info.get('final_value', '?')
+            value = info.get(value_key, '?')
             ax.text(x, y, str(value), ha='center', va='center', 
                    fontsize=13, fontweight='bold', zorder=4)
             
@@ -360,6 +552,11 @@ def draw_minimax_tree(ax, board, show_pruning=False, show_annotations=False):
                        fontsize=10, color='darkred', fontweight='bold',
                        bbox=dict(boxstyle="round,pad=0.3", facecolor="lightyellow", alpha=0.8))
     
+    ax.add_collection(PatchCollection(rect_patches, match_original=True))
+    ax.add_collection(PatchCollection(circle_patches, match_original=True, zorder=3))
+    if pruned_marks:
+        ax.plot(*zip(*pruned_marks), 'rx', markersize=30, markeredgewidth=5)
+    
     # Add pruning annotations if requested
     if show_annotations and show_pruning:
         for node_id, prune_info in pruning_info.items():
@@ -399,15 +596,15 @@ def draw_minimax_tree(ax, board, show_pruning=False, show_annotations=False):
            fontweight='bold')
     
     # Add final decision
-    if node_info[root].get('final_value'):
+    if node_info[root].get(value_key):
         best_move = None
-        for child in G.successors(root):
-            if node_info[child].get('final_value') == node_info[root]['final_value']:
-                best_move = G.edges[(root, child)]['move']
+        for child in children.get(root, []):
+            if node_info[child].get(value_key) == node_info[root][value_key]:
+                best_move = edge_attrs[(root, child)]['move']
                 break
         
         if best_move:
-            ax.text(0, 1, f"Best Move: {best_move} (Value: {node_info[root]['final_value']})",
+            ax.text(0, 1, f"Best Move: {best_move} (Value: {node_info[root][value_key]})",
                    fontsize=16, ha='center', fontweight='bold',
                    bbox=dict(boxstyle="round,pad=0.6", facecolor="lightgreen", 
                            edgecolor='darkgreen', alpha=0.9, linewidth=2))
@@ -428,28 +625,11 @@ def draw_minimax_tree(ax, board, show_pruning=False, show_annotations=False):
                        edgecolor='blue', alpha=0.8, linewidth=2),
                verticalalignment='top', fontweight='bold')
 
-def calculate_tree_positions(G, node_info, root):
+def calculate_tree_positions(levels):
     """Calculate positions for tree nodes with better spacing"""
+    # levels maps each tree level to its node ids in left-to-right order
     pos = {}
     
-    # Build level structure
-    levels = {}
-    queue = [(root, 0)]
-    visited = set()
-    
-    while queue:
-        node, level = queue.pop(0)
-        if node in visited:
-            continue
-        visited.add(node)
-        
-        if level not in levels:
-            levels[level] = []
-        levels[level].append(node)
-        
-        for child in G.successors(node):
-            queue.append((child, level + 1))
-    
     # Position nodes with proper spacing
     y_spacing = -2.5
     
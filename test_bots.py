@@ -5,57 +5,51 @@ Run this before tournaments to check for issues
 """
 
 import subprocess
+import select
 import time
 import chess
 
+def send(proc, cmd):
+    """Send a UCI command to the bot"""
+    proc.stdin.write((cmd + '\n').encode())
+    proc.stdin.flush()
+
+def read_until(proc, sentinel, timeout=2.0):
+    """Read output lines until one contains sentinel or the timeout expires"""
+    end = time.monotonic() + timeout
+    out = []
+    while time.monotonic() < end:
+        ready, _, _ = select.select([proc.stdout], [], [], max(0, end - time.monotonic()))
+        if not ready:
+            break
+        line = proc.stdout.readline()
+        if not line:
+            break
+        line = line.decode().strip()
+        out.append(line)
+        if sentinel in line:
+            return out
+    return out
+
 def test_bot(bot_path, test_name):
     """Test a bot with various UCI commands"""
     print(f"\nTesting {test_name}...")
     print("-" * 40)
     
     try:
-        # Start the bot process
+        # Start the bot process (unbuffered, so select() sees every line)
         proc = subprocess.Popen(
             ['python3', bot_path],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1
+            bufsize=0
         )
         
-        def send_command(cmd):
-            """Send command and get response"""
-            proc.stdin.write(cmd + '\n')
-            proc.stdin.flush()
-            time.sleep(0.1)
-            
-            responses = []
-            while True:
-                try:
-                    line = proc.stdout.readline()
-                    if line:
-                        responses.append(line.strip())
-                    else:
-                        break
-                except:
-                    break
-            return responses
-        
         # Test 1: UCI handshake
         print("Test 1: UCI handshake")
-        proc.stdin.write("uci\n")
-        proc.stdin.flush()
-        time.sleep(0.5)
-        
-        response = []
-        while True:
-            line = proc.stdout.readline()
-            if not line:
-                break
-            response.append(line.strip())
-            if "uciok" in line:
-                break
+        send(proc, "uci")
+        response = read_until(proc, "uciok", timeout=5.0)  # Includes interpreter startup
         
         if any("uciok" in r for r in response):
             print("✓ UCI handshake successful")
@@ -65,12 +59,10 @@ def test_bot(bot_path, test_name):
         
         # Test 2: Ready check
         print("Test 2: Ready check")
-        proc.stdin.write("isready\n")
-        proc.stdin.flush()
-        time.sleep(0.5)
+        send(proc, "isready")
         
-        line = proc.stdout.readline().strip()
-        if "readyok" in line:
+        response = read_until(proc, "readyok")
+        if any("readyok" in r for r in response):
             print("✓ Ready check successful")
         else:
             print("✗ Ready check failed")
@@ -78,29 +70,14 @@ def test_bot(bot_path, test_name):
         
         # Test 3: New game
         print("Test 3: New game")
-        proc.stdin.write("ucinewgame\n")
-        proc.stdin.flush()
-        time.sleep(0.1)
+        send(proc, "ucinewgame")
         print("✓ New game command sent")
         
         # Test 4: Starting position
         print("Test 4: Starting position")
-        proc.stdin.write("position startpos\n")
-        proc.stdin.flush()
-        time.sleep(0.1)
-        
-        proc.stdin.write("go movetime 100\n")
-        proc.stdin.flush()
-        time.sleep(0.3)
-        
-        response = []
-        while True:
-            line = proc.stdout.readline()
-            if not line:
-                break
-            response.append(line.strip())
-            if "bestmove" in line:
-                break
+        send(proc, "position startpos")
+        send(proc, "go movetime 100")
+        response = read_until(proc, "bestmove")
         
         bestmove_line = next((r for r in response if r.startswith("bestmove")), None)
         if bestmove_line:
@@ -122,22 +99,9 @@ def test_bot(bot_path, test_name):
         
         # Test 5: Position with moves
         print("Test 5: Position with moves")
-        proc.stdin.write("position startpos moves e2e4 e7e5\n")
-        proc.stdin.flush()
-        time.sleep(0.1)
-        
-        proc.stdin.write("go movetime 100\n")
-        proc.stdin.flush()
-        time.sleep(0.3)
-        
-        response = []
-        while True:
-            line = proc.stdout.readline()
-            if not line:
-                break
-            response.append(line.strip())
-            if "bestmove" in line:
-                break
+        send(proc, "position startpos moves e2e4 e7e5")
+        send(proc, "go movetime 100")
+        response = read_until(proc, "bestmove")
         
         bestmove_line = next((r for r in response if r.startswith("bestmove")), None)
         if bestmove_line:
@@ -162,22 +126,9 @@ def test_bot(bot_path, test_name):
         # Test 6: FEN position
         print("Test 6: FEN position")
         fen = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
-        proc.stdin.write(f"position fen {fen}\n")
-        proc.stdin.flush()
-        time.sleep(0.1)
-        
-        proc.stdin.write("go movetime 100\n")
-        proc.stdin.flush()
-        time.sleep(0.3)
-        
-        response = []
-        while True:
-            line = proc.stdout.readline()
-            if not line:
-                break
-            response.append(line.strip())
-            if "bestmove" in line:
-                break
+        send(proc, f"position fen {fen}")
+        send(proc, "go movetime 100")
+        response = read_until(proc, "bestmove")
         
         bestmove_line = next((r for r in response if r.startswith("bestmove")), None)
         if bestmove_line:
@@ -199,12 +150,12 @@ def test_bot(bot_path, test_name):
         
         # Clean shutdown
         print("Test 7: Clean shutdown")
-        proc.stdin.write("quit\n")
-        proc.stdin.flush()
-        time.sleep(0.5)
-        
-        proc.terminate()
-        proc.wait(timeout=2)
+        send(proc, "quit")
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.terminate()
+            proc.wait(timeout=2)
         print("✓ Clean shutdown")
         
         print(f"\n✅ All tests passed for {test_name}!")
@@ -218,6 +169,32 @@ def test_bot(bot_path, test_name):
             pass
         return False
 
+def test_transposition_table():
+    """Check that Knightmare's search files every table entry under a position key"""
+    print("\nTesting Knightmare transposition table...")
+    print("-" * 40)
+    
+    from knightmare_bot import KnightmareBot
+    
+    board = chess.Board()
+    for san in ["e4", "e5", "Nf3", "Nc6"]:
+        board.push_san(san)
+    
+    bot = KnightmareBot()
+    tt = {}
+    move = None
+    for depth in range(1, 4):
+        _, move = bot.minimax(board, depth, -float('inf'), float('inf'),
+                              board.turn == chess.WHITE, tt=tt, hashmove=move)
+    
+    key_len = len(board._transposition_key())
+    bad_keys = [key for key in tt if len(key) != key_len]
+    if bad_keys:
+        print(f"✗ {len(bad_keys)} of {len(tt)} entries not keyed by position: {bad_keys[:3]}")
+        return False
+    print(f"✓ All {len(tt)} entries keyed by position")
+    return True
+
 def main():
     print("=" * 50)
     print("Chess Bot UCI Protocol Tester")
@@ -226,6 +203,7 @@ def main():
     # Test both bots
     knightmare_ok = test_bot("knightmare_bot.py", "Knightmare Bot")
     random_ok = test_bot("random_chess_bot.py", "Random Bot")
+    tt_ok = test_transposition_table()
     
     print("\n" + "=" * 50)
     print("Test Results:")
@@ -241,7 +219,12 @@ def main():
     else:
         print("❌ Random Bot: FAILED")
     
-    if knightmare_ok and random_ok:
+    if tt_ok:
+        print("✅ Knightmare transposition table: PASSED")
+    else:
+        print("❌ Knightmare transposition table: FAILED")
+    
+    if knightmare_ok and random_ok and tt_ok:
         print("\n🎉 Both bots are ready for tournament play!")
     else:
         print("\n⚠️ Fix the failing bot(s) before running tournaments")